@@ -0,0 +1,185 @@
+import asyncio
+import os
+import secrets
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+
+# --- Password hashing pool ---
+# bcrypt is deliberately slow. Running it on Starlette's shared threadpool lets a login storm starve every
+# other sync route, so hashing and verification go to a dedicated, bounded pool instead. Requests beyond
+# HASH_MAX_PENDING are refused with a 503 rather than queueing without limit.
+# By default that pool is threads (bcrypt releases the GIL), which works everywhere including serverless hosts
+# that can't fork worker processes; on long-running servers ECOQUEST_HASH_WORKERS=N uses N processes instead.
+
+HASH_WORKERS = int(os.getenv("ECOQUEST_HASH_WORKERS", "0"))
+HASH_MAX_PENDING = int(os.getenv("ECOQUEST_HASH_MAX_PENDING", "256"))
+
+_pwd_context = None
+
+
+def _context() -> CryptContext:
+    # Built lazily so each worker process creates its own.
+    global _pwd_context
+    if _pwd_context is None: _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+def _hash(password: str) -> str:
+    return _context().hash(password)
+
+
+def _verify(password: str, password_hash: str) -> bool:
+    return _context().verify(password, password_hash)
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(self.workers) if self.workers > 0 else ThreadPoolExecutor(4, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _timed(self, fn, queued_at, *args):
+        started = time.perf_counter()
+        with self._lock: self.running += 1; self.total_wait += started - queued_at
+        try:
+            return fn(*args)
+        finally:
+            with self._lock: self.running -= 1; self.total_run += time.perf_counter() - started
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordPoolBusy()
+            self.pending += 1
+        queued_at = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            if isinstance(self._get_executor(), ProcessPoolExecutor):
+                # Timing has to happen on this side of the process boundary.
+                result = await loop.run_in_executor(self._get_executor(), fn, *args)
+                with self._lock: self.total_run += time.perf_counter() - queued_at
+                return result
+            return await loop.run_in_executor(self._get_executor(), self._timed, fn, queued_at, *args)
+        finally:
+            with self._lock: self.pending -= 1; self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._submit(_verify, password, password_hash)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers, "mode": "process" if self.workers > 0 else "thread",
+                "queue_depth": self.pending, "running": self.running, "max_pending": self.max_pending,
+                "completed": self.completed, "rejected": self.rejected,
+                # Queue wait can only be separated from run time when the work runs in-process.
+                "avg_wait_ms": round(self.total_wait / self.completed * 1000, 2) if self.completed and self.workers <= 0 else None,
+                "avg_total_ms": round(self.total_run / self.completed * 1000, 2) if self.completed else 0,
+            }
+
+    def shutdown(self):
+        if self._executor is not None: self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasher()
+
+
+# --- Session tokens ---
+# Login hands out a signed token carrying the user's id and role, so later requests can be authorised
+# from the token alone instead of looking the student/teacher up again.
+# Tokens are signed with ECOQUEST_SECRET_KEY, which every instance/worker must share. Until every client sends
+# tokens (ECOQUEST_REQUIRE_AUTH unset), requests without a token, or with one this instance can't verify, are
+# served anonymously; once tokens are required the key must be configured or the app refuses to start.
+
+REQUIRE_AUTH = os.getenv("ECOQUEST_REQUIRE_AUTH", "").lower() in ("1", "true", "yes")
+if REQUIRE_AUTH and not os.getenv("ECOQUEST_SECRET_KEY"):
+    raise RuntimeError("ECOQUEST_REQUIRE_AUTH is set but ECOQUEST_SECRET_KEY is not; every instance needs the same signing key.")
+SECRET_KEY = os.getenv("ECOQUEST_SECRET_KEY") or secrets.token_urlsafe(32)
+ALGORITHM = "HS256"
+TOKEN_TTL_MINUTES = int(os.getenv("ECOQUEST_TOKEN_TTL_MINUTES", str(12 * 60)))
+
+
+@dataclass(frozen=True)
+class Identity:
+    subject: uuid.UUID
+    role: str  # 'student' or 'teacher'
+
+
+def create_access_token(subject: uuid.UUID, role: str) -> str:
+    expires = datetime.now(timezone.utc) + timedelta(minutes=TOKEN_TTL_MINUTES)
+    return jwt.encode({"sub": str(subject), "role": role, "exp": expires}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_access_token(token: str) -> Identity:
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return Identity(uuid.UUID(claims["sub"]), claims["role"])
+    except (JWTError, KeyError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid or expired token", headers={"WWW-Authenticate": "Bearer"})
+
+
+def identity_from_token(token: Optional[str]) -> Optional[Identity]:
+    """ Applies the rules above to a token from any source (Authorization header, or the query string for live updates). """
+    if token:
+        if REQUIRE_AUTH: return decode_access_token(token)
+        try:
+            return decode_access_token(token)
+        except HTTPException:
+            return None  # e.g. signed by an instance with a different key; optional auth treats it as no token
+    if REQUIRE_AUTH: raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return None
+
+
+def current_identity(request: Request) -> Optional[Identity]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return identity_from_token(token if scheme.lower() == "bearer" else None)
+
+
+def student_access(student_id: uuid.UUID, identity: Optional[Identity] = Depends(current_identity)) -> Optional[Identity]:
+    """ The student themselves, or any teacher. """
+    if identity and not (identity.role == "teacher" or identity.subject == student_id):
+        raise HTTPException(status_code=403, detail="Not allowed to access this student")
+    return identity
+
+
+def teacher_access(teacher_id: uuid.UUID, identity: Optional[Identity] = Depends(current_identity)) -> Optional[Identity]:
+    """ Only the teacher named in the path. """
+    if identity and not (identity.role == "teacher" and identity.subject == teacher_id):
+        raise HTTPException(status_code=403, detail="Not allowed to access this teacher")
+    return identity
+
+
+def teacher_only(identity: Optional[Identity] = Depends(current_identity)) -> Optional[Identity]:
+    if identity and identity.role != "teacher": raise HTTPException(status_code=403, detail="Teachers only")
+    return identity
@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+# Rule-driven badge engine.
+# Badges are declared as rules (a fact, a threshold and the events that can change that fact) instead of
+# being hard-coded in the routes. On each event only the rules listening for it are evaluated, only for the
+# students involved who don't hold the badge yet, using one set-based query per fact. Evaluation runs inside
+# the caller's transaction and grants are idempotent bulk inserts, so re-evaluating is always safe.
+# When a rule is added, `python -m app.manage backfill-badges` grants it to existing students in batches.
+
+PHOTO_APPROVED = "photo_approved"
+QUIZ_GRADED = "quiz_graded"
+POINTS_CHANGED = "points_changed"
+
+# A registry that is missing a rule's badge (e.g. deployed before `backfill-badges` created the row) re-reads
+# the badges table at most this often, so running processes pick the new badge up without a restart.
+MISSING_BADGE_RELOAD_SECONDS = 30
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    badge: str
+    description: str
+    icon_url: str
+    fact: str  # 'approved_tasks', 'photo_approvals', 'quizzes_aced', 'points' or 'streak_days'
+    threshold: int
+    events: Tuple[str, ...]
+
+
+RULES: List[BadgeRule] = [
+    BadgeRule("First Steps", "Complete your first task!", "🦶", "approved_tasks", 1, (PHOTO_APPROVED, QUIZ_GRADED)),
+    BadgeRule("Eco Warrior", "Get your first photo submission approved!", "🛡️", "photo_approvals", 1, (PHOTO_APPROVED,)),
+    BadgeRule("Quiz Whiz", "Ace your first quiz!", "🧠", "quizzes_aced", 1, (QUIZ_GRADED,)),
+    BadgeRule("Quiz Master", "Ace 5 quizzes!", "🎓", "quizzes_aced", 5, (QUIZ_GRADED,)),
+    BadgeRule("Eco Champion", "Earn 1000 points!", "🏆", "points", 1000, (POINTS_CHANGED,)),
+    BadgeRule("On a Roll", "Earn points 3 days in a row!", "🔥", "streak_days", 3, (POINTS_CHANGED,)),
+]
+
+
+class BadgeRegistry:
+    """ Badge name -> id, read from the badges table once per process instead of once per request.
+    While some rule's badge has no row yet, the table is re-read every MISSING_BADGE_RELOAD_SECONDS. """
+
+    def __init__(self, rules: List[BadgeRule]):
+        self.rules = rules
+        self._lock = threading.Lock()
+        self._ids: Optional[Dict[str, uuid.UUID]] = None
+        self._reload_at: Optional[float] = None  # set only while a rule's badge is missing
+
+    def _stale(self) -> bool:
+        return self._ids is None or (self._reload_at is not None and time.monotonic() >= self._reload_at)
+
+    def ids(self, db: Session) -> Dict[str, uuid.UUID]:
+        if not self._stale(): return self._ids
+        with self._lock:
+            if self._stale():
+                first_load = self._ids is None
+                self._ids = {name: badge_id for badge_id, name in db.query(models.Badge.id, models.Badge.name)}
+                missing = [r.badge for r in self.rules if r.badge not in self._ids]
+                if missing and first_load: logger.warning("Badges %s have rules but no rows; run `python -m app.manage backfill-badges`", missing)
+                self._reload_at = time.monotonic() + MISSING_BADGE_RELOAD_SECONDS if missing else None
+        return self._ids
+
+    def sync(self, db: Session):
+        """ Creates the badge rows the rules need (commits) and reloads the registry. """
+        crud.sync_badges(db, [{"name": r.badge, "description": r.description, "icon_url": r.icon_url} for r in self.rules])
+        self.invalidate()
+
+    def invalidate(self):
+        with self._lock: self._ids = None; self._reload_at = None
+
+
+class BadgeEngine:
+    def __init__(self, rules: List[BadgeRule]):
+        self.rules = rules
+        self.registry = BadgeRegistry(rules)
+
+    # --- Facts: one query per kind of fact, for just the students being evaluated ---
+    def _approvals(self, db: Session, student_ids) -> Dict[str, Dict[uuid.UUID, int]]:
+        sub, task = models.StudentSubmission, models.EcoTask
+        facts = {"approved_tasks": {}, "photo_approvals": {}, "quizzes_aced": {}}
+        for student_id, task_type, n in db.query(sub.student_id, task.task_type, func.count()).join(task, sub.task_id == task.id).filter(
+                sub.student_id.in_(student_ids), sub.status == 'approved').group_by(sub.student_id, task.task_type):
+            facts["approved_tasks"][student_id] = facts["approved_tasks"].get(student_id, 0) + n
+            # Quiz submissions are only approved when every answer was right.
+            if task_type == "photo_upload": facts["photo_approvals"][student_id] = n
+            elif task_type == "quiz": facts["quizzes_aced"][student_id] = n
+        return facts
+
+    def _points(self, db: Session, student_ids) -> Dict[uuid.UUID, int]:
+        return {sid: points or 0 for sid, points in db.query(models.Student.id, models.Student.points).filter(models.Student.id.in_(student_ids))}
+
+    def _streaks(self, db: Session, student_ids, longest: int) -> Dict[uuid.UUID, int]:
+        # Consecutive days, ending today, with points in the day rollups; only the last `longest` days are read.
+        today = datetime.utcnow().date()
+        rollup = models.PointsRollup
+        active: Dict[uuid.UUID, Set] = {}
+        for sid, day in db.query(rollup.student_id, rollup.bucket_start).filter(
+                rollup.student_id.in_(student_ids), rollup.bucket_kind == "day",
+                rollup.bucket_start > today - timedelta(days=longest), rollup.points > 0):
+            active.setdefault(sid, set()).add(day)
+        streaks = {}
+        for sid, days in active.items():
+            n = 0
+            while today - timedelta(days=n) in days: n += 1
+            streaks[sid] = n
+        return streaks
+
+    def _facts(self, db: Session, rules: List[BadgeRule], student_ids) -> Dict[str, Dict[uuid.UUID, int]]:
+        needed = {r.fact for r in rules}
+        facts = {}
+        if needed & {"approved_tasks", "photo_approvals", "quizzes_aced"}: facts.update(self._approvals(db, student_ids))
+        if "points" in needed: facts["points"] = self._points(db, student_ids)
+        if "streak_days" in needed: facts["streak_days"] = self._streaks(db, student_ids, max(r.threshold for r in rules if r.fact == "streak_days"))
+        return facts
+
+    # --- Evaluation ---
+    def _evaluate(self, db: Session, rules: List[BadgeRule], student_ids: List[uuid.UUID]) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        if not rules or not student_ids: return []
+        ids = self.registry.ids(db)
+        rules = [r for r in rules if r.badge in ids]
+        if not rules: return []
+        db.flush()  # facts must include the caller's not-yet-flushed ORM changes
+        assoc = models.student_badge_association
+        held = set(db.query(assoc.c.student_id, assoc.c.badge_id).filter(
+            assoc.c.student_id.in_(student_ids), assoc.c.badge_id.in_([ids[r.badge] for r in rules])))
+        candidates = {r: [sid for sid in student_ids if (sid, ids[r.badge]) not in held] for r in rules}
+        candidates = {r: sids for r, sids in candidates.items() if sids}
+        if not candidates: return []
+        facts = self._facts(db, list(candidates), sorted({sid for sids in candidates.values() for sid in sids}))
+        return crud.grant_badges(db, [(sid, ids[r.badge]) for r, sids in candidates.items() for sid in sids if facts[r.fact].get(sid, 0) >= r.threshold])
+
+    def evaluate(self, db: Session, event: str, student_ids: Iterable[uuid.UUID]) -> List[Tuple[uuid.UUID, uuid.UUID]]:
+        """ Grants whatever the event earned. Approvals also move points, so POINTS_CHANGED rules run with them.
+        Does not commit; returns the new (student_id, badge_id) pairs. """
+        events = {event, POINTS_CHANGED}
+        return self._evaluate(db, [r for r in self.rules if events & set(r.events)], sorted(set(student_ids)))
+
+    def awarder(self, event: str):
+        """ The `award_badges(db, student_ids)` hook taken by the bulk crud writers. """
+        return lambda db, student_ids: self.evaluate(db, event, student_ids)
+
+    def backfill(self, db: Session, badge: Optional[str] = None, batch_size: int = 1000) -> int:
+        """ Evaluates one badge's rules (or all of them) for every student, keyset-batched, committing per batch. """
+        rules = [r for r in self.rules if badge is None or r.badge == badge]
+        if not rules: raise ValueError(f"No rule awards a badge named {badge!r}")
+        self.registry.sync(db)
+        granted, last = 0, None
+        while True:
+            q = db.query(models.Student.id).order_by(models.Student.id)
+            if last is not None: q = q.filter(models.Student.id > last)
+            batch = [sid for (sid,) in q.limit(batch_size)]
+            if not batch: return granted
+            granted += len(self._evaluate(db, rules, batch))
+            db.commit()
+            last = batch[-1]
+
+
+badge_engine = BadgeEngine(RULES)
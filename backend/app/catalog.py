@@ -0,0 +1,61 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+from . import crud
+from .serialization import dumps
+
+# In-process cache for the task catalog served by GET /api/tasks.
+# The catalog only changes through create_task and create_full_quiz, which call invalidate().
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    body: bytes
+    etag: str
+
+
+def _task_payload(task) -> dict:
+    # Mirrors EcoTaskResponse / QuizQuestionResponse; correct answers never leave the server.
+    return {
+        "id": str(task.id), "title": task.title, "description": task.description,
+        "points_reward": task.points_reward, "task_type": task.task_type,
+        "questions": [
+            {"id": str(q.id), "question_text": q.question_text, "option_a": q.option_a, "option_b": q.option_b, "option_c": q.option_c}
+            for q in task.questions
+        ],
+    }
+
+
+class TaskCatalogCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._snapshot = None
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None: return snapshot
+        version = self._version
+        tasks = crud.get_all_tasks_with_questions(db)
+        body = dumps([_task_payload(t) for t in tasks])
+        # Content-derived, so every serverless instance hands out the same ETag for the same catalog.
+        snapshot = CatalogSnapshot(version, body, '"%s"' % hashlib.sha1(body).hexdigest())
+        with self._lock:
+            # Don't publish a load that raced with a write.
+            if self._version == version: self._snapshot = snapshot
+        return snapshot
+
+
+task_catalog = TaskCatalogCache()
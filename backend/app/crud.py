@@ -1,6 +1,9 @@
-from sqlalchemy.orm import Session
-from . import models
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.orm import Session, selectinload
+from . import ledger, models
+from .pagination import keyset_after
 import uuid
+from datetime import datetime, timedelta
 
 # --- User and Student Functions ---
 def get_user_by_email(db: Session, email: str):
@@ -16,6 +19,9 @@ def create_teacher(db: Session, email: str, password_hash: str, full_name: str):
 def get_student_by_id(db: Session, student_id: uuid.UUID):
     return db.query(models.Student).filter(models.Student.id == student_id).first()
 
+def get_teacher_id_of_student(db: Session, student_id: uuid.UUID):
+    return db.query(models.Student.teacher_id).filter(models.Student.id == student_id).scalar()
+
 def get_student_by_id_card(db: Session, student_id_card: str):
     return db.query(models.Student).filter(models.Student.student_id_card == student_id_card).first()
 
@@ -31,44 +37,287 @@ def create_student(db: Session, student_id_card: str, full_name: str, class_name
     db.refresh(db_student)
     return db_student
 
-def get_students_by_teacher(db: Session, teacher_id: uuid.UUID):
-    return db.query(models.Student).filter(models.Student.teacher_id == teacher_id).all()
+# List queries below are keyset-paginated: `after` is the sort key of the last row already seen and
+# `limit` caps the page. The *_query builders are also used unexecuted for NDJSON streaming (yield_per).
+def roster_query(db: Session, teacher_id: uuid.UUID, after=None):
+    q = db.query(models.Student.id, models.Student.full_name, models.Student.class_name, models.Student.points).filter(
+        models.Student.teacher_id == teacher_id
+    ).order_by(models.Student.full_name, models.Student.id)
+    if after: q = q.filter(keyset_after((models.Student.full_name, models.Student.id), after))
+    return q
+
+def get_students_by_teacher(db: Session, teacher_id: uuid.UUID, after=None, limit=None):
+    q = roster_query(db, teacher_id, after)
+    return (q.limit(limit) if limit else q).all()
 
 
 # --- Task, Submission, and Gamification Functions ---
 def get_all_tasks(db: Session):
     return db.query(models.EcoTask).all()
 
+def get_all_tasks_with_questions(db: Session):
+    # Two queries regardless of the number of tasks: one for tasks, one IN-load for all their questions.
+    return db.query(models.EcoTask).options(selectinload(models.EcoTask.questions)).all()
+
+def create_eco_task(db: Session, title: str, description: str, points_reward: int, task_type: str):
+    task = models.EcoTask(title=title, description=description, points_reward=points_reward, task_type=task_type)
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    return task
+
 def get_task_by_id(db: Session, task_id: uuid.UUID):
     return db.query(models.EcoTask).filter(models.EcoTask.id == task_id).first()
 
 def create_submission(db: Session, student_id: uuid.UUID, task_id: uuid.UUID, data: str, status: str):
     submission = models.StudentSubmission(student_id=student_id, task_id=task_id, submission_data=data, status=status)
     db.add(submission)
+    bump_student_stats(db, {student_id: {status: 1}})
     db.commit()
     db.refresh(submission)
     return submission
 
-def get_pending_submissions_by_teacher(db: Session, teacher_id: uuid.UUID):
-    return db.query(models.StudentSubmission).join(models.Student).filter(
+def pending_submissions_query(db: Session, teacher_id: uuid.UUID, after=None):
+    # One joined query returning only the columns the review list shows, oldest first.
+    q = db.query(
+        models.StudentSubmission.id,
+        models.Student.full_name.label("student_name"),
+        models.EcoTask.title.label("task_title"),
+        models.StudentSubmission.submission_data,
+        models.StudentSubmission.submitted_at,
+    ).join(models.Student, models.StudentSubmission.student_id == models.Student.id
+    ).join(models.EcoTask, models.StudentSubmission.task_id == models.EcoTask.id
+    ).filter(
         models.Student.teacher_id == teacher_id,
         models.StudentSubmission.status == 'pending'
-    ).all()
+    ).order_by(models.StudentSubmission.submitted_at, models.StudentSubmission.id)
+    if after: q = q.filter(keyset_after((models.StudentSubmission.submitted_at, models.StudentSubmission.id), after))
+    return q
+
+def get_pending_submissions_by_teacher(db: Session, teacher_id: uuid.UUID, after=None, limit=None):
+    q = pending_submissions_query(db, teacher_id, after)
+    return (q.limit(limit) if limit else q).all()
+
+def submission_history_query(db: Session, student_id: uuid.UUID, after=None):
+    # Newest first; served by ix_student_submissions_student_submitted.
+    q = db.query(
+        models.StudentSubmission.id,
+        models.EcoTask.title.label("task_title"),
+        models.StudentSubmission.status,
+        models.StudentSubmission.submitted_at,
+    ).join(models.EcoTask, models.StudentSubmission.task_id == models.EcoTask.id
+    ).filter(models.StudentSubmission.student_id == student_id
+    ).order_by(models.StudentSubmission.submitted_at.desc(), models.StudentSubmission.id.desc())
+    if after: q = q.filter(keyset_after((models.StudentSubmission.submitted_at, models.StudentSubmission.id), after, descending=True))
+    return q
+
+def get_submissions_by_student(db: Session, student_id: uuid.UUID, after=None, limit=None):
+    q = submission_history_query(db, student_id, after)
+    return (q.limit(limit) if limit else q).all()
 
 def get_submission_by_id(db: Session, submission_id: uuid.UUID):
     return db.query(models.StudentSubmission).filter(models.StudentSubmission.id == submission_id).first()
 
-def get_badge_by_name(db: Session, name: str):
-    return db.query(models.Badge).filter(models.Badge.name == name).first()
+def decide_submission(db: Session, submission_id: uuid.UUID, status: str, teacher_id: uuid.UUID = None):
+    """ Moves one pending submission to `status` with a conditional UPDATE ... RETURNING, so of two concurrent
+    decisions on the same submission only one can succeed. With `teacher_id`, only submissions from that teacher's
+    students match. Does not commit; returns (id, student_id, task_id), or None if nothing matched. """
+    sub = models.StudentSubmission
+    stmt = update(sub).where(sub.id == submission_id, sub.status == 'pending')
+    if teacher_id is not None: stmt = stmt.where(sub.student_id.in_(db.query(models.Student.id).filter(models.Student.teacher_id == teacher_id).scalar_subquery()))
+    return db.execute(stmt.values(status=status).returning(sub.id, sub.student_id, sub.task_id).execution_options(synchronize_session=False)).first()
 
-def award_badge_to_student(db: Session, student: models.Student, badge: models.Badge):
-    if badge not in student.badges:
-        student.badges.append(badge)
-        db.commit()
+def get_points_reward(db: Session, task_id: uuid.UUID):
+    return db.query(models.EcoTask.points_reward).filter(models.EcoTask.id == task_id).scalar()
+
+def sync_badges(db: Session, badges):
+    # Creates the badges ({name, description, icon_url}) that don't exist yet; existing names are left alone.
+    if not badges: return
+    db.execute(dialect_insert(db, models.Badge.__table__).values([{"id": uuid.uuid4(), **b} for b in badges]).on_conflict_do_nothing(index_elements=["name"]))
+    db.commit()
+
+def grant_badges(db: Session, pairs):
+    """ Idempotent bulk grant of (student_id, badge_id) pairs: one multi-row INSERT ... ON CONFLICT DO NOTHING.
+    Does not commit; the caller owns the transaction. Returns the pairs that were actually new. """
+    pairs = list(dict.fromkeys(pairs))
+    if not pairs: return []
+    assoc = models.student_badge_association
+    stmt = dialect_insert(db, assoc).values([{"student_id": s, "badge_id": b} for s, b in pairs])
+    return [tuple(row) for row in db.execute(stmt.on_conflict_do_nothing().returning(assoc.c.student_id, assoc.c.badge_id))]
+
+def credit_points(db: Session, points_by_student, reason: str):
+    """ Credits points atomically and set-based, without reading the current totals first:
+    one UPDATE ... SET points = points + CASE id ... END RETURNING, one multi-row points_ledger INSERT and
+    one upsert of the student's day and week rollups. Does not commit; returns {student_id: new_total}. """
+    points_by_student = {sid: delta for sid, delta in points_by_student.items() if delta}
+    if not points_by_student: return {}
+    result = db.execute(update(models.Student).where(models.Student.id.in_(list(points_by_student))).values(
+        points=func.coalesce(models.Student.points, 0) + case(points_by_student, value=models.Student.id, else_=0)
+    ).returning(models.Student.id, models.Student.points, models.Student.class_name, models.Student.teacher_id
+    ).execution_options(synchronize_session=False)).all()
+    if not result: return {}
+    db.execute(insert(models.PointsLedger), [{"student_id": row.id, "delta": points_by_student[row.id], "reason": reason} for row in result])
+    rollups = models.PointsRollup.__table__
+    stmt = dialect_insert(db, rollups).values([
+        {"student_id": row.id, "bucket_kind": kind, "bucket_start": start, "class_name": row.class_name, "teacher_id": row.teacher_id, "points": points_by_student[row.id]}
+        for row in result for kind, start in ledger.current_buckets().items()
+    ])
+    db.execute(stmt.on_conflict_do_update(index_elements=[rollups.c.student_id, rollups.c.bucket_kind, rollups.c.bucket_start], set_={
+        "points": rollups.c.points + stmt.excluded.points, "class_name": stmt.excluded.class_name, "teacher_id": stmt.excluded.teacher_id,
+    }))
+    return {row.id: row.points for row in result}
+
+def get_windowed_leaderboard(db: Session, period: str, limit: int = 10, class_name: str = None, teacher_id: uuid.UUID = None):
+    # Top students by points earned in the current day/week bucket; a range read on one of the rollup indexes.
+    rollup = models.PointsRollup
+    q = db.query(rollup.student_id.label("id"), models.Student.full_name, rollup.class_name, rollup.points
+    ).join(models.Student, models.Student.id == rollup.student_id
+    ).filter(rollup.bucket_kind == period, rollup.bucket_start == ledger.current_buckets()[period])
+    if class_name is not None: q = q.filter(rollup.class_name == class_name)
+    if teacher_id is not None: q = q.filter(rollup.teacher_id == teacher_id)
+    return q.order_by(rollup.points.desc(), rollup.student_id).limit(limit).all()
+
+def get_student_progress(db: Session, student_id: uuid.UUID, period: str, buckets: int):
+    # Points per bucket for a progress chart, oldest first; a primary-key range read.
+    today = datetime.utcnow().date()
+    since = ledger.bucket_start(period, today - (timedelta(days=buckets - 1) if period == "day" else timedelta(weeks=buckets - 1)))
+    rollup = models.PointsRollup
+    return db.query(rollup.bucket_start, rollup.points).filter(
+        rollup.student_id == student_id, rollup.bucket_kind == period, rollup.bucket_start >= since
+    ).order_by(rollup.bucket_start).all()
+
+def bulk_review_submissions(db: Session, teacher_id: uuid.UUID, approve_ids, reject_ids, award_badges=None):
+    """ Applies many approve/reject decisions for one teacher's students in a single transaction.
+    Only pending submissions belonging to the teacher's students are touched; everything else is reported as skipped.
+    `award_badges(db, student_ids)` runs inside the transaction for the students who had approvals. """
+    approve_ids, reject_ids = set(approve_ids), set(reject_ids) - set(approve_ids)
+    pending = db.query(
+        models.StudentSubmission.id, models.StudentSubmission.student_id, models.EcoTask.points_reward
+    ).join(models.Student, models.StudentSubmission.student_id == models.Student.id
+    ).join(models.EcoTask, models.StudentSubmission.task_id == models.EcoTask.id
+    ).filter(
+        models.StudentSubmission.id.in_(list(approve_ids | reject_ids)),
+        models.StudentSubmission.status == 'pending',
+        models.Student.teacher_id == teacher_id,
+    ).with_for_update(of=models.StudentSubmission).all()
+
+    approved = [row for row in pending if row.id in approve_ids]
+    rejected = [row for row in pending if row.id in reject_ids]
+    stats = {}
+    for status, rows in (('approved', approved), ('rejected', rejected)):
+        if rows: db.execute(update(models.StudentSubmission).where(models.StudentSubmission.id.in_([row.id for row in rows])).values(status=status).execution_options(synchronize_session=False))
+        for row in rows:
+            delta = stats.setdefault(row.student_id, {})
+            delta['pending'] = delta.get('pending', 0) - 1; delta[status] = delta.get(status, 0) + 1
+    bump_student_stats(db, stats)
+
+    points_by_student = {}
+    for row in approved: points_by_student[row.student_id] = points_by_student.get(row.student_id, 0) + row.points_reward
+    new_points = credit_points(db, points_by_student, reason='photo_approval')
+    badges_granted = award_badges(db, list(points_by_student)) if award_badges and approved else []
+    db.commit()
+
+    done = {row.id for row in pending}
+    return {
+        "approved": [row.id for row in approved], "rejected": [row.id for row in rejected],
+        "decisions": [{"submission_id": row.id, "student_id": row.student_id, "status": status} for status, rows in (('approved', approved), ('rejected', rejected)) for row in rows],
+        "skipped": [i for i in approve_ids | reject_ids if i not in done],
+        "new_points": new_points, "badges_granted": badges_granted,
+    }
+
+def record_quiz_results(db: Session, task_id: uuid.UUID, points_reward: int, sheets, award_badges=None):
+    """ Persists graded quiz sheets ({student_id, score, total}) in one transaction: one student existence check,
+    one multi-row submission INSERT, one points UPDATE and, through `award_badges(db, student_ids)`, one batched badge grant.
+    Also returns each graded student's teacher (`teachers`), read by the same existence check, for live updates. """
+    teachers = dict(db.query(models.Student.id, models.Student.teacher_id).filter(models.Student.id.in_({s["student_id"] for s in sheets})))
+    results, submissions, points_by_student = [], [], {}
+    for sheet in sheets:
+        student_id, score, total = sheet["student_id"], sheet["score"], sheet["total"]
+        if student_id not in teachers:
+            results.append({"student_id": student_id, "score": score, "total": total, "status": "student_not_found"})
+            continue
+        status = 'approved' if score == total else 'rejected'
+        submissions.append({"id": uuid.uuid4(), "student_id": student_id, "task_id": task_id, "submission_data": f"Score: {score}/{total}", "status": status})
+        if status == 'approved': points_by_student[student_id] = points_by_student.get(student_id, 0) + points_reward
+        results.append({"student_id": student_id, "score": score, "total": total, "status": status, "submission_id": submissions[-1]["id"]})
+    if submissions: db.execute(insert(models.StudentSubmission), submissions)
+    stats = {}
+    for sub in submissions:
+        delta = stats.setdefault(sub["student_id"], {}); delta[sub["status"]] = delta.get(sub["status"], 0) + 1
+    bump_student_stats(db, stats)
+    new_points = credit_points(db, points_by_student, reason='quiz')
+    badges_granted = award_badges(db, list(points_by_student)) if award_badges and points_by_student else []
+    db.commit()
+    return {"results": results, "new_points": new_points, "badges_granted": badges_granted, "teachers": teachers}
+
+def dialect_insert(db: Session, table):
+    # INSERT that supports on_conflict_do_*; Postgres in production, SQLite for local benchmarks.
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert(table)
+    from sqlalchemy.dialects.postgresql import insert as pg_insert
+    return pg_insert(table)
+
+def bump_student_stats(db: Session, deltas):
+    """ Applies {student_id: {'pending': +1, 'approved': ...}} to student_stats as one multi-row upsert.
+    Does not commit; it rides on the caller's transaction with the submission change it describes. """
+    if not deltas: return
+    rows = [{
+        "student_id": student_id, "pending_count": d.get("pending", 0), "approved_count": d.get("approved", 0),
+        "rejected_count": d.get("rejected", 0), "last_activity_at": func.now(),
+    } for student_id, d in deltas.items()]
+    stats = models.StudentStats.__table__
+    stmt = dialect_insert(db, stats).values(rows)
+    db.execute(stmt.on_conflict_do_update(index_elements=[stats.c.student_id], set_={
+        "pending_count": stats.c.pending_count + stmt.excluded.pending_count,
+        "approved_count": stats.c.approved_count + stmt.excluded.approved_count,
+        "rejected_count": stats.c.rejected_count + stmt.excluded.rejected_count,
+        "last_activity_at": stmt.excluded.last_activity_at,
+    }))
+
+def get_teacher_dashboard(db: Session, teacher_id: uuid.UUID):
+    # One indexed read: the teacher's students (ix_students_teacher_name) joined to their counters by primary key.
+    return db.query(
+        models.Student.id, models.Student.full_name, models.Student.class_name, models.Student.points,
+        func.coalesce(models.StudentStats.pending_count, 0).label("pending_count"),
+        func.coalesce(models.StudentStats.approved_count, 0).label("approved_count"),
+        func.coalesce(models.StudentStats.rejected_count, 0).label("rejected_count"),
+        models.StudentStats.last_activity_at,
+    ).outerjoin(models.StudentStats, models.StudentStats.student_id == models.Student.id
+    ).filter(models.Student.teacher_id == teacher_id
+    ).order_by(models.Student.full_name, models.Student.id).all()
+
+def rebuild_student_stats(db: Session):
+    # Recomputes every counter from submission history; for backfilling and repairing drift.
+    sub = models.StudentSubmission
+    rows = db.query(
+        sub.student_id,
+        func.sum(case((sub.status == 'pending', 1), else_=0)),
+        func.sum(case((sub.status == 'approved', 1), else_=0)),
+        func.sum(case((sub.status == 'rejected', 1), else_=0)),
+        func.max(sub.submitted_at),
+    ).filter(sub.student_id.isnot(None)).group_by(sub.student_id).all()
+    db.query(models.StudentStats).delete(synchronize_session=False)
+    if rows:
+        db.execute(insert(models.StudentStats), [
+            {"student_id": sid, "pending_count": p or 0, "approved_count": a or 0, "rejected_count": r or 0, "last_activity_at": last}
+            for sid, p, a, r, last in rows
+        ])
+    db.commit()
+    return len(rows)
 
 def get_leaderboard(db: Session, limit: int = 10):
     return db.query(models.Student).order_by(models.Student.points.desc()).limit(limit).all()
 
+def get_student_profile_rows(db: Session, student_ids):
+    # Flat projections for profile payloads, in two queries: (id, full_name, points) rows in `student_ids`
+    # order (ids that don't exist are dropped) and (student_id, name, description, icon_url) badge rows.
+    if not student_ids: return [], []
+    assoc = models.student_badge_association
+    rows = {row.id: row for row in db.query(models.Student.id, models.Student.full_name, models.Student.points).filter(models.Student.id.in_(student_ids))}
+    badges = db.query(assoc.c.student_id, models.Badge.name, models.Badge.description, models.Badge.icon_url
+    ).join(models.Badge, models.Badge.id == assoc.c.badge_id).filter(assoc.c.student_id.in_(student_ids)).order_by(models.Badge.name).all()
+    return [rows[i] for i in student_ids if i in rows], badges
 
 # --- Function to add default content ---
 def add_initial_data(db: Session):
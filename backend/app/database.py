@@ -1,25 +1,50 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from dotenv import load_dotenv
 
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Pool sizing is configurable per deployment. On serverless (vercel.json) each instance serves few
+# concurrent requests and the Supabase pooler already multiplexes connections, so DB_POOL=null is a good fit.
+# Creating the engine does not connect; the first connection is opened by the first query (or warm_up()).
+DB_POOL = os.getenv("DB_POOL", "queue").lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+def _engine_options(url: str) -> dict:
+    if url.startswith("sqlite"):
+        # Local benchmarks and tests; connections are shared across the threadpool.
+        return {"connect_args": {"check_same_thread": False}}
+    if DB_POOL == "null":
+        return {"poolclass": NullPool, "pool_pre_ping": True}
+    return {
+        "pool_pre_ping": True, "pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT, "pool_recycle": DB_POOL_RECYCLE,
+    }
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+def warm_up():
+    """ Opens (and returns to the pool) one connection ahead of the first request. """
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,59 @@
+import threading
+import uuid
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+
+from sqlalchemy.orm import Session, selectinload
+from . import models
+
+# Compiled quiz answer keys.
+# Each quiz is loaded from eco_tasks/quiz_questions once and frozen into an AnswerKey, so grading a
+# submission is a dict lookup per question and never touches quiz_questions. Keys are dropped when quizzes
+# are created or edited (see invalidate()).
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    task_id: uuid.UUID
+    task_type: str
+    points_reward: int
+    answers: Mapping[str, str]  # question id -> 'A' / 'B' / 'C'
+
+    @property
+    def total(self) -> int:
+        return len(self.answers)
+
+    def grade(self, submitted: Dict[str, str]) -> int:
+        return sum(1 for qid, correct in self.answers.items() if submitted.get(qid) == correct)
+
+
+class AnswerKeyCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: Dict[uuid.UUID, AnswerKey] = {}
+        self._generation = 0
+
+    def get(self, db: Session, task_id: uuid.UUID) -> Optional[AnswerKey]:
+        key = self._keys.get(task_id)
+        if key is not None: return key
+        generation = self._generation
+        task = db.query(models.EcoTask).options(selectinload(models.EcoTask.questions)).filter(models.EcoTask.id == task_id).first()
+        if not task: return None
+        key = AnswerKey(
+            task_id=task.id, task_type=task.task_type, points_reward=task.points_reward,
+            answers=MappingProxyType({str(q.id): q.correct_answer for q in task.questions}),
+        )
+        with self._lock:
+            # A key compiled while an invalidation ran may already be stale; serve it once but don't keep it.
+            if generation == self._generation: self._keys[task_id] = key
+        return key
+
+    def invalidate(self, task_id: Optional[uuid.UUID] = None):
+        with self._lock:
+            self._generation += 1
+            if task_id is None: self._keys.clear()
+            else: self._keys.pop(task_id, None)
+
+
+answer_keys = AnswerKeyCache()
@@ -0,0 +1,211 @@
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Opt-in per-request SQL instrumentation.
+# Set ECOQUEST_SQL_PROFILE=1 to record, for every route, how many statements it issues, how long they
+# take, how many rows they fetch and which statement shapes repeat (the usual sign of an N+1 load).
+
+SQL_PROFILE_ENABLED = os.getenv("ECOQUEST_SQL_PROFILE", "").lower() in ("1", "true", "yes")
+# A statement shape seen this many times in one request is reported as a likely N+1.
+N_PLUS_ONE_THRESHOLD = int(os.getenv("ECOQUEST_SQL_N_PLUS_ONE_THRESHOLD", "3"))
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\bIN\s*\([^)]*\)", re.IGNORECASE)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def statement_shape(statement: str) -> str:
+    """ Normalises a statement so that the same query with different parameters compares equal. """
+    shape = _IN_LIST.sub("IN (?)", statement)
+    shape = _LITERAL.sub("?", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestStats:
+    def __init__(self):
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.shapes: Counter = Counter()
+
+    def repeated_shapes(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> Dict[str, int]:
+        return {shape: n for shape, n in self.shapes.items() if n >= threshold}
+
+    def as_dict(self) -> dict:
+        return {
+            "statements": self.statements, "db_time_ms": round(self.db_time * 1000, 3), "rows": self.rows,
+            "n_plus_one": self.repeated_shapes(),
+        }
+
+
+class _RowCountingCursor:
+    """ Wraps a DBAPI cursor so the rows a result actually fetches are counted. cursor.rowcount can't be used:
+    DBAPIs only have to fill it in for DML, and SQLite reports -1 for every SELECT. """
+
+    def __init__(self, cursor, scopes):
+        self._cursor = cursor
+        self._scopes = scopes
+
+    def _count(self, rows):
+        for stats in self._scopes: stats.rows += len(rows)
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            for stats in self._scopes: stats.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        return self._count(self._cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        return self._count(self._cursor.fetchall())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+_current: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("ecoquest_sql_stats", default=None)
+
+
+class RouteStats:
+    def __init__(self):
+        self.calls = 0
+        self.statements = 0
+        self.max_statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.n_plus_one: Counter = Counter()
+        self.budget_violations = 0
+
+    def as_dict(self, budget: Optional[int]) -> dict:
+        return {
+            "calls": self.calls, "statements": self.statements, "max_statements": self.max_statements,
+            "avg_statements": round(self.statements / self.calls, 2) if self.calls else 0,
+            "db_time_ms": round(self.db_time * 1000, 3), "rows": self.rows,
+            "n_plus_one": dict(self.n_plus_one), "budget": budget, "budget_violations": self.budget_violations,
+        }
+
+
+class SQLProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+        self._budgets: Dict[str, int] = {}
+        self._installed = set()
+
+    # --- Engine hooks ---
+    def install(self, engine: Engine):
+        if id(engine) in self._installed: return
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        self._installed.add(id(engine))
+
+    @staticmethod
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get(): conn.info.setdefault("ecoquest_sql_start", []).append(time.perf_counter())
+
+    @staticmethod
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        active = _current.get()
+        if not active: return
+        started = conn.info["ecoquest_sql_start"].pop()
+        elapsed = time.perf_counter() - started
+        shape = statement_shape(statement)
+        # Every open scope (a request and any nested count_queries block) sees the statement.
+        for stats in active:
+            stats.statements += 1; stats.db_time += elapsed; stats.shapes[shape] += 1
+        # Statements that return rows (SELECT, or DML with RETURNING) are read through the context's cursor.
+        if context is not None and cursor.description is not None: context.cursor = _RowCountingCursor(cursor, active)
+
+    # --- Scopes ---
+    @contextmanager
+    def track(self):
+        """ Collects statements issued in this context (and threads/tasks spawned from it). """
+        stats = RequestStats()
+        token = _current.set((_current.get() or []) + [stats])
+        try:
+            yield stats
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def count_queries(self, max_queries: Optional[int] = None):
+        """ For tests: `with sql_profiler.count_queries(3): client.get(...)` fails on a fourth statement. """
+        with self.track() as stats:
+            yield stats
+        if max_queries is not None and stats.statements > max_queries:
+            raise QueryBudgetExceeded(f"{stats.statements} statements issued, budget is {max_queries}: {stats.as_dict()}")
+
+    # --- Per-route aggregation and budgets ---
+    def declare_budget(self, route: str, max_queries: int):
+        self._budgets[route] = max_queries
+
+    def record(self, route: str, stats: RequestStats) -> bool:
+        """ Folds a finished request into its route's totals; returns False if it broke the route's budget. """
+        budget = self._budgets.get(route)
+        within_budget = budget is None or stats.statements <= budget
+        with self._lock:
+            agg = self._routes[route]
+            agg.calls += 1; agg.statements += stats.statements; agg.db_time += stats.db_time; agg.rows += stats.rows
+            agg.max_statements = max(agg.max_statements, stats.statements)
+            agg.n_plus_one.update(stats.repeated_shapes())
+            if not within_budget: agg.budget_violations += 1
+        return within_budget
+
+    def report(self) -> dict:
+        with self._lock:
+            return {route: agg.as_dict(self._budgets.get(route)) for route, agg in sorted(self._routes.items())}
+
+    def check_budgets(self):
+        """ Raises if any route has gone over its declared budget since the last reset. """
+        over = {route: stats for route, stats in self.report().items() if stats["budget_violations"]}
+        if over: raise QueryBudgetExceeded(f"Routes over their query budget: {over}")
+
+    def reset(self):
+        with self._lock: self._routes.clear()
+
+
+sql_profiler = SQLProfiler()
+
+
+def install_sql_profiling(app, engine: Engine):
+    """ Wires the profiler into the engine, adds X-DB-* response headers and the /api/debug/sql endpoint. """
+    sql_profiler.install(engine)
+
+    @app.middleware("http")
+    async def sql_profile_middleware(request, call_next):
+        with sql_profiler.track() as stats:
+            response = await call_next(request)
+        route = request.scope.get("route")
+        within_budget = sql_profiler.record(getattr(route, "path", request.url.path), stats)
+        response.headers["X-DB-Queries"] = str(stats.statements)
+        response.headers["X-DB-Time-ms"] = "%.3f" % (stats.db_time * 1000)
+        response.headers["X-DB-Rows"] = str(stats.rows)
+        if stats.repeated_shapes(): response.headers["X-DB-N-Plus-One"] = str(len(stats.repeated_shapes()))
+        if not within_budget: response.headers["X-DB-Budget-Exceeded"] = "1"
+        return response
+
+    @app.get("/api/debug/sql", tags=["Debug"])
+    def sql_profile_report():
+        """ Per-route statement counts, DB time, rows fetched and repeated statement shapes since startup. """
+        return sql_profiler.report()
+
+    @app.post("/api/debug/sql/reset", tags=["Debug"])
+    def sql_profile_reset():
+        sql_profiler.reset()
+        return {"message": "SQL profile reset."}
@@ -0,0 +1,170 @@
+import bisect
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from . import models
+
+# In-memory ranked leaderboard.
+# The board is seeded from the students table and then updated in place by the routes that change points,
+# so reads never have to ORDER BY over the whole table. Other processes (every serverless instance has its
+# own board) write to the same database, so the board is rebuilt from it once it is older than
+# ECOQUEST_LEADERBOARD_REFRESH_SECONDS; that bounds how long their students and points can be missing here.
+
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("ECOQUEST_LEADERBOARD_REFRESH_SECONDS", "10"))
+
+
+@dataclass
+class LeaderboardEntry:
+    id: uuid.UUID
+    full_name: str
+    class_name: Optional[str]
+    teacher_id: Optional[uuid.UUID]
+    points: int
+
+    @property
+    def key(self) -> Tuple[int, str]:
+        # Highest points first; ties broken by id so the order is stable.
+        return (-self.points, str(self.id))
+
+
+class _RankedList:
+    """ Keys kept sorted so that rank and neighbour lookups are a single bisect. """
+
+    def __init__(self):
+        self.keys: List[Tuple[int, str]] = []
+
+    def add(self, key):
+        bisect.insort(self.keys, key)
+
+    def remove(self, key):
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def index(self, key) -> int:
+        return bisect.bisect_left(self.keys, key)
+
+    def rank(self, points: int) -> int:
+        # Competition ranking: 1 + number of students with strictly more points.
+        return bisect.bisect_left(self.keys, (-points,)) + 1
+
+
+class Leaderboard:
+    def __init__(self, refresh_seconds: float = LEADERBOARD_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._seeded_at: Optional[float] = None
+        self._replay: Optional[list] = None  # writes made while a rebuild's query runs, re-applied to its result
+        self._entries: Dict[str, LeaderboardEntry] = {}
+        self._boards: Dict[tuple, _RankedList] = {}
+
+    # --- Maintenance ---
+    def _fresh(self) -> bool:
+        return self._seeded_at is not None and time.monotonic() - self._seeded_at < self.refresh_seconds
+
+    def ensure_seeded(self, db: Session):
+        """ Builds the board on first use and rebuilds it from the database once it is older than refresh_seconds.
+        While one thread rebuilds, others keep reading the previous board instead of waiting. """
+        if self._fresh(): return
+        if not self._rebuild_lock.acquire(blocking=self._seeded_at is None): return
+        try:
+            if self._fresh(): return
+            with self._lock: self._replay = []
+            rows = db.query(
+                models.Student.id, models.Student.full_name, models.Student.class_name,
+                models.Student.teacher_id, models.Student.points,
+            ).all()
+            with self._lock:
+                self._entries, self._boards = {}, {}
+                for row in rows:
+                    self._insert(LeaderboardEntry(row.id, row.full_name, row.class_name, row.teacher_id, row.points or 0))
+                replay, self._replay = self._replay, None
+                self._seeded_at = time.monotonic()
+                for apply, args in replay: apply(*args)
+        finally:
+            self._replay = None
+            self._rebuild_lock.release()
+
+    def reset(self):
+        """ Drops the in-memory board; the next read re-seeds it from the database. """
+        with self._lock:
+            self._seeded_at = None
+            self._entries.clear(); self._boards.clear()
+
+    def record(self, student: models.Student):
+        """ Adds a student or moves them to their new position after a points change. """
+        self.update(student.id, student.full_name, student.class_name, student.teacher_id, student.points or 0)
+
+    def update(self, student_id, full_name, class_name, teacher_id, points: int):
+        with self._lock:
+            if self._replay is not None: self._replay.append((self.update, (student_id, full_name, class_name, teacher_id, points)))
+            if self._seeded_at is None: return  # The seed query will pick the change up.
+            old = self._entries.get(str(student_id))
+            if old: self._remove(old)
+            self._insert(LeaderboardEntry(student_id, full_name, class_name, teacher_id, points))
+
+    def set_points(self, student_id, points: int):
+        with self._lock:
+            if self._replay is not None: self._replay.append((self.set_points, (student_id, points)))
+            old = self._entries.get(str(student_id))
+            if not old: return
+            self._remove(old)
+            self._insert(LeaderboardEntry(old.id, old.full_name, old.class_name, old.teacher_id, points))
+
+    def _board_keys(self, entry: LeaderboardEntry):
+        yield ("global",)
+        if entry.class_name is not None: yield ("class", entry.class_name)
+        if entry.teacher_id is not None: yield ("teacher", str(entry.teacher_id))
+
+    def _insert(self, entry: LeaderboardEntry):
+        self._entries[str(entry.id)] = entry
+        for board in self._board_keys(entry):
+            self._boards.setdefault(board, _RankedList()).add(entry.key)
+
+    def _remove(self, entry: LeaderboardEntry):
+        del self._entries[str(entry.id)]
+        for board in self._board_keys(entry):
+            self._boards[board].remove(entry.key)
+
+    # --- Reads ---
+    def teacher_of(self, student_id):
+        entry = self._entries.get(str(student_id))
+        return entry.teacher_id if entry else None
+
+    def _board(self, class_name: Optional[str] = None, teacher_id=None) -> Optional[_RankedList]:
+        if teacher_id is not None: return self._boards.get(("teacher", str(teacher_id)))
+        if class_name is not None: return self._boards.get(("class", class_name))
+        return self._boards.get(("global",))
+
+    def _ranked(self, board: _RankedList, keys) -> List[dict]:
+        return [dict(vars(self._entries[key[1]]), rank=board.rank(-key[0])) for key in keys]
+
+    def top(self, limit: int = 10, class_name: Optional[str] = None, teacher_id=None) -> List[dict]:
+        with self._lock:
+            board = self._board(class_name, teacher_id)
+            if not board or limit < 1: return []
+            return self._ranked(board, board.keys[:limit])
+
+    def standing(self, student_id, radius: int = 2, class_name: Optional[str] = None, teacher_id=None) -> Optional[dict]:
+        """ Returns a student's rank on a board plus the `radius` students either side of them. """
+        with self._lock:
+            entry = self._entries.get(str(student_id))
+            board = self._board(class_name, teacher_id)
+            if not entry or not board: return None
+            i = board.index(entry.key)
+            if i >= len(board.keys) or board.keys[i] != entry.key: return None
+            return {
+                "rank": board.rank(entry.points),
+                "total": len(board.keys),
+                "student": self._ranked(board, [entry.key])[0],
+                "neighbours": self._ranked(board, board.keys[max(0, i - radius):i + radius + 1]),
+            }
+
+
+leaderboard = Leaderboard()
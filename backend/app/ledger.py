@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .database import SessionLocal
+
+# Points ledger housekeeping.
+# Credits append to points_ledger and bump the day/week rollups (see crud.credit_points). Compaction keeps
+# the ledger bounded: rows older than LEDGER_RETENTION_DAYS are folded into one 'compacted' row per student
+# (so per-student sums never change) and day rollups older than the retention window are dropped.
+
+LEDGER_RETENTION_DAYS = int(os.getenv("ECOQUEST_LEDGER_RETENTION_DAYS", "90"))
+DAY_ROLLUP_RETENTION_DAYS = int(os.getenv("ECOQUEST_DAY_ROLLUP_RETENTION_DAYS", "400"))
+# Hours between background compaction runs; 0 disables the in-process job (use `python -m app.manage compact-ledger`).
+COMPACTION_INTERVAL_HOURS = float(os.getenv("ECOQUEST_LEDGER_COMPACTION_HOURS", "0"))
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("day", "week")
+
+
+def bucket_start(kind: str, today: date) -> date:
+    return today if kind == "day" else today - timedelta(days=today.weekday())
+
+
+def current_buckets(now: datetime = None) -> dict:
+    today = (now or datetime.utcnow()).date()
+    return {kind: bucket_start(kind, today) for kind in PERIODS}
+
+
+def compact_ledger(db: Session, now: datetime = None) -> dict:
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=LEDGER_RETENTION_DAYS)
+    ledger = models.PointsLedger
+    totals = db.query(ledger.student_id, func.sum(ledger.delta), func.count()).filter(ledger.created_at < cutoff).group_by(ledger.student_id).all()
+    # Only students with more than one old row gain anything from folding.
+    totals = [(student_id, delta) for student_id, delta, rows in totals if rows > 1]
+    if totals:
+        student_ids = [student_id for student_id, _ in totals]
+        folded = db.query(ledger).filter(ledger.created_at < cutoff, ledger.student_id.in_(student_ids)).delete(synchronize_session=False)
+        db.bulk_insert_mappings(ledger, [
+            {"student_id": student_id, "delta": delta, "reason": "compacted", "created_at": cutoff - timedelta(seconds=1)}
+            for student_id, delta in totals
+        ])
+    else:
+        folded = 0
+    rollups_dropped = db.query(models.PointsRollup).filter(
+        models.PointsRollup.bucket_kind == "day",
+        models.PointsRollup.bucket_start < (now - timedelta(days=DAY_ROLLUP_RETENTION_DAYS)).date(),
+    ).delete(synchronize_session=False)
+    db.commit()
+    return {"ledger_rows_folded": folded, "students_compacted": len(totals), "day_rollups_dropped": rollups_dropped}
+
+
+def _compact_once():
+    with SessionLocal() as db:
+        return compact_ledger(db)
+
+
+async def run_compaction_forever(interval_hours: float = COMPACTION_INTERVAL_HOURS):
+    while True:
+        try:
+            logger.info("Ledger compaction: %s", await run_in_threadpool(_compact_once))
+        except Exception:
+            logger.exception("Ledger compaction failed")
+        await asyncio.sleep(interval_hours * 3600)
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set
+
+# In-process pub/sub hub for live dashboard updates.
+# Topics are "teacher:<id>", "student:<id>" and "leaderboard". Routes publish small delta events after they
+# commit; each connection gets its own bounded, coalescing mailbox so:
+#   - repeated events about the same thing (e.g. a student's points during a burst) collapse into the latest one;
+#   - a slow client whose mailbox fills up is sent a single "resync" event instead of an ever-growing backlog;
+#   - publishing never waits on any connection, so one slow client can't stall the others or the route.
+
+MAILBOX_SIZE = 100
+
+
+def teacher_topic(teacher_id) -> str: return f"teacher:{teacher_id}"
+def student_topic(student_id) -> str: return f"student:{student_id}"
+LEADERBOARD_TOPIC = "leaderboard"
+
+
+class Subscription:
+    def __init__(self, hub: "LiveHub", topics: Iterable[str], mailbox_size: int = MAILBOX_SIZE):
+        self.hub = hub
+        self.topics: Set[str] = set(topics)
+        self.mailbox_size = mailbox_size
+        self._pending: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._wake = asyncio.Event()
+        self.coalesced = 0
+        self.overflows = 0
+
+    def offer(self, key: tuple, event: dict):
+        # Runs on the event loop thread only.
+        if key in self._pending:
+            self._pending[key] = event; self.coalesced += 1
+        elif len(self._pending) >= self.mailbox_size:
+            self._pending.clear(); self.overflows += 1
+            self._pending[("resync",)] = {"type": "resync"}
+        else:
+            self._pending[key] = event
+        self._wake.set()
+
+    async def next_batch(self, timeout: Optional[float] = None) -> list:
+        """ Waits for events and returns everything queued so far (empty list on timeout). """
+        if not self._pending:
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        batch = list(self._pending.values()); self._pending.clear()
+        return batch
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class LiveHub:
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        self._loop = asyncio.get_running_loop()
+        sub = Subscription(self, topics)
+        with self._lock:
+            for topic in sub.topics: self._subscribers.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            for topic in sub.topics:
+                subs = self._subscribers.get(topic)
+                if subs:
+                    subs.discard(sub)
+                    if not subs: del self._subscribers[topic]
+
+    def publish(self, topic: str, event: dict, key: Optional[tuple] = None):
+        """ Safe to call from sync routes running in the threadpool. `key` identifies what the event is about;
+        a newer event with the same key replaces an undelivered older one. """
+        if self._loop is None or topic not in self._subscribers: return
+        self.published += 1
+        key = (topic,) + (key or (event.get("type"), str(uuid.uuid4())))
+        try:
+            self._loop.call_soon_threadsafe(self._dispatch, topic, key, event)
+        except RuntimeError:
+            pass  # Event loop already closed (shutdown).
+
+    def _dispatch(self, topic: str, key: tuple, event: dict):
+        with self._lock: subs = list(self._subscribers.get(topic, ()))
+        for sub in subs: sub.offer(key, dict(event, topic=topic))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            subs = {sub for topic_subs in self._subscribers.values() for sub in topic_subs}
+            return {
+                "connections": len(subs), "topics": len(self._subscribers), "published": self.published,
+                "coalesced": sum(s.coalesced for s in subs), "overflows": sum(s.overflows for s in subs),
+            }
+
+
+hub = LiveHub()
+
+
+# --- Event helpers used by the routes ---
+def publish_submission(teacher_id, student_id, submission_id, status: str):
+    event = {"type": "submission", "submission_id": str(submission_id), "student_id": str(student_id), "status": status}
+    if teacher_id: hub.publish(teacher_topic(teacher_id), event, key=("submission", str(submission_id)))
+    hub.publish(student_topic(student_id), event, key=("submission", str(submission_id)))
+
+
+def publish_points(new_points: Dict):
+    for student_id, points in new_points.items():
+        hub.publish(student_topic(student_id), {"type": "points", "student_id": str(student_id), "points": points}, key=("points",))
+    if new_points: hub.publish(LEADERBOARD_TOPIC, {"type": "leaderboard_changed"}, key=("leaderboard_changed",))
+
+
+def encode_sse(batch: list) -> str:
+    return "".join(f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in batch)
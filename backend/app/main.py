@@ -1,17 +1,34 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+import json
+import os
+import time
+_import_started = time.perf_counter()
+
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, EmailStr
-from typing import List, Dict
+from pydantic import BaseModel, ConfigDict, EmailStr
+from typing import List, Dict, Optional
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 
 from . import crud, models
-from .database import engine, get_db
-from passlib.context import CryptContext
-
-# This creates the tables in your database if they don't already exist
-models.Base.metadata.create_all(bind=engine)
+from .leaderboard import leaderboard
+from .catalog import task_catalog
+from .response_cache import response_cache
+from .serialization import dumps, json_response, profile_payloads
+from .grading import answer_keys
+from .badges import PHOTO_APPROVED, QUIZ_GRADED, badge_engine
+from .live import LEADERBOARD_TOPIC, encode_sse, hub, publish_points, publish_submission, student_topic, teacher_topic
+from .photos import ALLOWED_CONTENT_TYPES, MAX_PHOTO_BYTES, MULTIPART_OVERHEAD_BYTES, PhotoTooLarge, open_multipart_file, original_path, photo_processor, photo_url, register_photo, store_stream, thumbnail_path, thumbnail_url_for
+from .ledger import COMPACTION_INTERVAL_HOURS, PERIODS, run_compaction_forever
+from .roster_import import import_roster
+from .pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor, ndjson_response, page_size
+from .instrumentation import SQL_PROFILE_ENABLED, install_sql_profiling, sql_profiler
+from .database import engine, get_db, warm_up
+from starlette.concurrency import run_in_threadpool
+from .auth import Identity, PasswordPoolBusy, create_access_token, identity_from_token, password_hasher, student_access, teacher_access, teacher_only
 
 # Initialize the FastAPI app
 app = FastAPI()
@@ -24,15 +41,46 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
-# --- Initial Data Setup ---
-# This runs only once when the server starts to populate the database with demo content
-with Session(engine) as db_session:
-    crud.add_initial_data(db_session)
+# --- SQL Instrumentation (opt-in) ---
+# With ECOQUEST_SQL_PROFILE=1 every response carries X-DB-* headers and /api/debug/sql reports per-route totals.
+# Requests that go over these statement budgets are flagged; tests can call sql_profiler.check_budgets().
+ROUTE_QUERY_BUDGETS = {
+    "/api/tasks": 2,
+    "/api/leaderboard": 3,
+    "/api/student/{student_id}/profile": 2,
+    "/api/teacher/{teacher_id}/submissions": 1,
+}
+for route, budget in ROUTE_QUERY_BUDGETS.items(): sql_profiler.declare_budget(route, budget)
+if SQL_PROFILE_ENABLED: install_sql_profiling(app, engine)
+
+# --- Startup ---
+# Nothing touches the database at import time, so serverless cold starts only pay for imports.
+# Create the schema and demo content once with `python -m app.manage init-db`; for local development
+# ECOQUEST_INIT_DB_ON_STARTUP=1 does the same on startup. ECOQUEST_WARM_POOL=1 opens a connection
+# before the first request instead of during it.
+@app.on_event("startup")
+def startup_database():
+    if os.getenv("ECOQUEST_INIT_DB_ON_STARTUP", "").lower() in ("1", "true", "yes"):
+        from .manage import init_db
+        init_db()
+    if os.getenv("ECOQUEST_WARM_POOL", "").lower() in ("1", "true", "yes"): warm_up()
+
+# Keeps points_ledger bounded on long-running servers; serverless deployments run `python -m app.manage compact-ledger` instead.
+@app.on_event("startup")
+async def start_ledger_compaction():
+    if COMPACTION_INTERVAL_HOURS > 0: app.state.ledger_compaction = asyncio.create_task(run_compaction_forever())
+
+# Password hashing runs on its own bounded pool (see app/auth.py); a full queue is reported as 503.
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request: Request, exc: PasswordPoolBusy):
+    return JSONResponse(status_code=503, content={"detail": "Too many logins in progress, please retry."}, headers={"Retry-After": "1"})
 
-# Setup for password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@app.on_event("shutdown")
+def shutdown_worker_pools():
+    password_hasher.shutdown(); photo_processor.shutdown()
 
 
 # --- Pydantic Models (Data Schemas) ---
@@ -51,26 +99,59 @@ class StudentLogin(BaseModel): student_id_card: str
 
 # For quiz submissions from students
 class QuizSubmission(BaseModel): answers: Dict[str, str]
+class AnswerSheet(BaseModel): student_id: uuid.UUID; answers: Dict[str, str]
+class QuizBatchSubmission(BaseModel): sheets: List[AnswerSheet]
 
 # For API responses (ensures data sent to the frontend is clean and structured)
-class BadgeResponse(BaseModel): name: str; description: str; icon_url: str; 
-class Config: orm_mode = True
-class StudentProfileResponse(BaseModel): id: uuid.UUID; full_name: str; points: int; badges: List[BadgeResponse]; 
-class Config: orm_mode = True
-class StudentForTeacherResponse(BaseModel): id: uuid.UUID; full_name: str; class_name: str; points: int; 
-class Config: orm_mode = True
-class QuizQuestionResponse(BaseModel): id: uuid.UUID; question_text: str; option_a: str; option_b: str; option_c: str; 
-class Config: orm_mode = True
-class EcoTaskResponse(BaseModel): id: uuid.UUID; title: str; description: str; points_reward: int; task_type: str; questions: List[QuizQuestionResponse] = []; 
-class Config: orm_mode = True
-class SubmissionForTeacherResponse(BaseModel): id: uuid.UUID; student_name: str; task_title: str; submission_data: str; 
-class Config: orm_mode = True
-class SubmissionHistoryResponse(BaseModel): task_title: str; status: str; submitted_at: datetime; 
-class Config: orm_mode = True
+class BadgeResponse(BaseModel):
+    name: str; description: str; icon_url: str
+    model_config = ConfigDict(from_attributes=True)
+class StudentProfileResponse(BaseModel):
+    id: uuid.UUID; full_name: str; points: int; badges: List[BadgeResponse]
+    model_config = ConfigDict(from_attributes=True)
+class StudentForTeacherResponse(BaseModel):
+    id: uuid.UUID; full_name: str; class_name: str; points: int
+    model_config = ConfigDict(from_attributes=True)
+class QuizQuestionResponse(BaseModel):
+    id: uuid.UUID; question_text: str; option_a: str; option_b: str; option_c: str
+    model_config = ConfigDict(from_attributes=True)
+class EcoTaskResponse(BaseModel):
+    id: uuid.UUID; title: str; description: str; points_reward: int; task_type: str; questions: List[QuizQuestionResponse] = []
+    model_config = ConfigDict(from_attributes=True)
+class SubmissionForTeacherResponse(BaseModel):
+    id: uuid.UUID; student_name: str; task_title: str; submission_data: str; thumbnail_url: Optional[str] = None
+    model_config = ConfigDict(from_attributes=True)
+class SubmissionHistoryResponse(BaseModel):
+    task_title: str; status: str; submitted_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+class BulkReview(BaseModel): approve: List[uuid.UUID] = []; reject: List[uuid.UUID] = []
+class BulkReviewResponse(BaseModel): approved: List[uuid.UUID]; rejected: List[uuid.UUID]; skipped: List[uuid.UUID]; badges_granted: int
+class DashboardStudentResponse(BaseModel): id: uuid.UUID; full_name: str; class_name: Optional[str] = None; points: int; pending_count: int; approved_count: int; rejected_count: int; last_activity_at: Optional[datetime] = None
+class DashboardTotalsResponse(BaseModel): students: int = 0; points: int = 0; pending_count: int = 0; approved_count: int = 0; rejected_count: int = 0
+class TeacherDashboardResponse(BaseModel): students: List[DashboardStudentResponse]; totals: DashboardTotalsResponse; classes: Dict[str, DashboardTotalsResponse]
+class LeaderboardEntryResponse(BaseModel): rank: int; id: uuid.UUID; full_name: str; class_name: Optional[str] = None; points: int
+class WindowedLeaderboardEntryResponse(BaseModel): id: uuid.UUID; full_name: str; class_name: Optional[str] = None; points: int
+class ProgressPointResponse(BaseModel): bucket_start: date; points: int
+class StudentStandingResponse(BaseModel): rank: int; total: int; student: LeaderboardEntryResponse; neighbours: List[LeaderboardEntryResponse]
 
 
 # --- API Routes ---
 
+# --- Post-commit hooks ---
+# Keep the in-memory leaderboard, cached responses and live subscribers in step with committed points,
+# badge and submission changes.
+def _points_changed(new_points):
+    for student_id, points in new_points.items(): leaderboard.set_points(student_id, points)
+    response_cache.points_changed(new_points)
+    publish_points(new_points)
+
+def _badges_granted(pairs):
+    response_cache.badges_changed({student_id for student_id, _ in pairs})
+
+def _teacher_of(db: Session, student_id: uuid.UUID):
+    return leaderboard.teacher_of(student_id) or crud.get_teacher_id_of_student(db, student_id)
+
+
 # Health Check Endpoint
 @app.get("/", tags=["Health Check"])
 def read_root():
@@ -79,113 +160,373 @@ def read_root():
 
 # Teacher Authentication and Management Routes
 @app.post("/api/teacher/register", status_code=status.HTTP_201_CREATED, tags=["Teacher"])
-def register_teacher(teacher: TeacherCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=teacher.email)
+async def register_teacher(teacher: TeacherCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=teacher.email)
     if db_user: raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = pwd_context.hash(teacher.password)
-    new_teacher = crud.create_teacher(db=db, email=teacher.email, password_hash=hashed_password, full_name=teacher.full_name)
+    hashed_password = await password_hasher.hash(teacher.password)
+    new_teacher = await run_in_threadpool(crud.create_teacher, db=db, email=teacher.email, password_hash=hashed_password, full_name=teacher.full_name)
     return {"message": "Teacher registered successfully", "teacher_id": new_teacher.id, "email": new_teacher.email}
 
 @app.post("/api/teacher/login", tags=["Teacher"])
-def login_teacher(form_data: TeacherLogin, db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.email)
-    if not user or not pwd_context.verify(form_data.password, user.password): raise HTTPException(status_code=401, detail="Incorrect email or password")
-    return {"message": "Login successful", "teacher_id": user.id, "full_name": user.full_name}
+async def login_teacher(form_data: TeacherLogin, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(crud.get_user_by_email, db, email=form_data.email)
+    if not user or not await password_hasher.verify(form_data.password, user.password): raise HTTPException(status_code=401, detail="Incorrect email or password")
+    return {"message": "Login successful", "teacher_id": user.id, "full_name": user.full_name, "access_token": create_access_token(user.id, "teacher"), "token_type": "bearer"}
 
-@app.post("/api/teacher/{teacher_id}/add-student", response_model=StudentForTeacherResponse, tags=["Teacher"])
+@app.post("/api/teacher/{teacher_id}/add-student", response_model=StudentForTeacherResponse, tags=["Teacher"], dependencies=[Depends(teacher_access)])
 def add_student_by_teacher(teacher_id: uuid.UUID, student: StudentCreate, db: Session = Depends(get_db)):
     db_student = crud.get_student_by_id_card(db, student_id_card=student.student_id_card)
     if db_student: raise HTTPException(status_code=400, detail="A student with this ID card is already registered.")
-    return crud.create_student(db=db, student_id_card=student.student_id_card, full_name=student.full_name, class_name=student.class_name, teacher_id=teacher_id)
+    new_student = crud.create_student(db=db, student_id_card=student.student_id_card, full_name=student.full_name, class_name=student.class_name, teacher_id=teacher_id)
+    leaderboard.record(new_student); response_cache.points_changed({new_student.id: 0})
+    return new_student
+
+@app.post("/api/teacher/{teacher_id}/students/import", tags=["Teacher"], dependencies=[Depends(teacher_access)])
+async def import_students(teacher_id: uuid.UUID, request: Request, format: Optional[str] = None, db: Session = Depends(get_db)):
+    """ Bulk roster import. Send CSV (header: student_id_card,full_name,class_name) or NDJSON as the raw request body. """
+    fmt = format or ("ndjson" if "json" in request.headers.get("content-type", "") else "csv")
+    if fmt not in ("csv", "ndjson"): raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'.")
+    try:
+        report = await import_roster(db, teacher_id, request.stream(), fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if report["accepted"]: leaderboard.reset(); response_cache.clear()
+    return report
 
-@app.get("/api/teacher/{teacher_id}/roster", response_model=List[StudentForTeacherResponse], tags=["Teacher"])
-def get_teacher_roster(teacher_id: uuid.UUID, db: Session = Depends(get_db)):
-    return crud.get_students_by_teacher(db, teacher_id=teacher_id)
+@app.get("/api/teacher/{teacher_id}/dashboard", response_model=TeacherDashboardResponse, tags=["Teacher"], dependencies=[Depends(teacher_access)])
+def get_teacher_dashboard(teacher_id: uuid.UUID, db: Session = Depends(get_db)):
+    """ Everything the teacher dashboard shows in one round trip: each student's points, submission counts
+    and last activity, plus totals per class and overall. Counters are maintained on write (student_stats). """
+    students, totals, classes = [], {}, {}
+    for row in crud.get_teacher_dashboard(db, teacher_id):
+        student = dict(row._mapping); student["points"] = student["points"] or 0
+        students.append(student)
+        for bucket in (totals, classes.setdefault(row.class_name or "", {})):
+            bucket["students"] = bucket.get("students", 0) + 1
+            for field in ("points", "pending_count", "approved_count", "rejected_count"): bucket[field] = bucket.get(field, 0) + student[field]
+    return {"students": students, "totals": totals, "classes": classes}
 
-@app.get("/api/teacher/{teacher_id}/submissions", response_model=List[SubmissionForTeacherResponse], tags=["Teacher"])
-def get_pending_submissions(teacher_id: uuid.UUID, db: Session = Depends(get_db)):
-    submissions = crud.get_pending_submissions_by_teacher(db, teacher_id)
-    return [SubmissionForTeacherResponse(id=s.id, student_name=s.student.full_name, task_title=s.task.title, submission_data=s.submission_data) for s in submissions]
+# List routes return one keyset page at a time; the cursor for the next page is in X-Next-Cursor.
+# With ?stream=true they instead stream every row as NDJSON from a server-side cursor.
+def _paged(rows, limit: int, response: Response, sort_key):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(*sort_key(rows[-1]))
+    return rows
+
+@app.get("/api/teacher/{teacher_id}/roster", response_model=List[StudentForTeacherResponse], tags=["Teacher"], dependencies=[Depends(teacher_access)])
+def get_teacher_roster(teacher_id: uuid.UUID, response: Response, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, stream: bool = False, db: Session = Depends(get_db)):
+    after = decode_cursor(cursor, (str, uuid.UUID)) if cursor else None
+    if stream: return ndjson_response(lambda db: crud.roster_query(db, teacher_id, after).yield_per(1000), lambda r: {"id": r.id, "full_name": r.full_name, "class_name": r.class_name, "points": r.points})
+    limit = page_size(limit)
+    return _paged(crud.get_students_by_teacher(db, teacher_id, after, limit + 1), limit, response, lambda r: (r.full_name, r.id))
+
+@app.get("/api/teacher/{teacher_id}/submissions", response_model=List[SubmissionForTeacherResponse], tags=["Teacher"], dependencies=[Depends(teacher_access)])
+def get_pending_submissions(teacher_id: uuid.UUID, response: Response, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, stream: bool = False, db: Session = Depends(get_db)):
+    after = decode_cursor(cursor, (datetime, uuid.UUID)) if cursor else None
+    to_dict = lambda s: {"id": s.id, "student_name": s.student_name, "task_title": s.task_title, "submission_data": s.submission_data, "thumbnail_url": thumbnail_url_for(s.submission_data)}
+    if stream: return ndjson_response(lambda db: crud.pending_submissions_query(db, teacher_id, after).yield_per(1000), to_dict)
+    limit = page_size(limit)
+    submissions = _paged(crud.get_pending_submissions_by_teacher(db, teacher_id, after, limit + 1), limit, response, lambda s: (s.submitted_at, s.id))
+    return [SubmissionForTeacherResponse(**to_dict(s)) for s in submissions]
 
 # Student Routes
 @app.post("/api/student/login", tags=["Student"])
 def login_student(form_data: StudentLogin, db: Session = Depends(get_db)):
     student = crud.get_student_by_id_card(db, student_id_card=form_data.student_id_card)
     if not student: raise HTTPException(status_code=404, detail="Student ID not found.")
-    return {"message": "Login successful", "student_id": str(student.id), "full_name": student.full_name}
+    return {"message": "Login successful", "student_id": str(student.id), "full_name": student.full_name, "access_token": create_access_token(student.id, "student"), "token_type": "bearer"}
 
-@app.get("/api/student/{student_id}/profile", response_model=StudentProfileResponse, tags=["Student"])
+@app.get("/api/student/{student_id}/profile", response_model=StudentProfileResponse, tags=["Student"], dependencies=[Depends(student_access)])
 def get_student_profile(student_id: uuid.UUID, db: Session = Depends(get_db)):
-    student = crud.get_student_by_id(db, student_id=student_id)
-    if not student: raise HTTPException(status_code=404, detail="Student not found")
-    return student
-
-@app.get("/api/student/{student_id}/submissions", response_model=List[SubmissionHistoryResponse], tags=["Student"])
-def get_student_submission_history(student_id: uuid.UUID, db: Session = Depends(get_db)):
-    return crud.get_submissions_by_student(db, student_id=student_id)
-    response = []
-    for s in submissions:
-        response.append(
-            SubmissionHistoryResponse(
-                task_title=s.task.title, # Correctly access the nested task title
-                status=s.status,
-                submitted_at=s.submitted_at
-            )
-        )
-    return response
+    body = response_cache.profile(student_id)
+    if body is None:
+        version = response_cache.version
+        profiles = profile_payloads(*crud.get_student_profile_rows(db, [student_id]))
+        if not profiles: raise HTTPException(status_code=404, detail="Student not found")
+        body = dumps(profiles[0]); response_cache.put_profile(student_id, body, version)
+    return json_response(body)
+
+@app.get("/api/student/{student_id}/submissions", response_model=List[SubmissionHistoryResponse], tags=["Student"], dependencies=[Depends(student_access)])
+def get_student_submission_history(student_id: uuid.UUID, response: Response, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, stream: bool = False, db: Session = Depends(get_db)):
+    after = decode_cursor(cursor, (datetime, uuid.UUID)) if cursor else None
+    to_dict = lambda s: {"task_title": s.task_title, "status": s.status, "submitted_at": s.submitted_at}
+    if stream: return ndjson_response(lambda db: crud.submission_history_query(db, student_id, after).yield_per(1000), to_dict)
+    limit = page_size(limit)
+    submissions = _paged(crud.get_submissions_by_student(db, student_id, after, limit + 1), limit, response, lambda s: (s.submitted_at, s.id))
+    return [SubmissionHistoryResponse(**to_dict(s)) for s in submissions]
 
 # Task Submission Routes
-@app.post("/api/student/{student_id}/submit/photo/{task_id}", tags=["Submissions"])
-def submit_photo_task(student_id: uuid.UUID, task_id: uuid.UUID, db: Session = Depends(get_db)):
-    crud.create_submission(db, student_id, task_id, "Photo awaiting review", "pending")
-    return {"message": "Submission received and awaiting teacher approval."}
+@app.post("/api/student/{student_id}/submit/photo/{task_id}", tags=["Submissions"], dependencies=[Depends(student_access)])
+async def submit_photo_task(student_id: uuid.UUID, task_id: uuid.UUID, request: Request, db: Session = Depends(get_db)):
+    """ Send the image either as the raw request body (Content-Type: image/*) or as the `photo` field of a
+    multipart form. It is streamed to content-addressed storage; thumbnailing happens after we respond. """
+    content_type = request.headers.get("content-type", "")
+    try:
+        content_length = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Content-Length.")
+    data, photo = "Photo awaiting review", None
+    try:
+        if content_type.startswith("multipart/form-data"):
+            if content_length > MAX_PHOTO_BYTES + MULTIPART_OVERHEAD_BYTES: raise PhotoTooLarge()
+            # Parsed as it streams in: the photo part goes straight to store_stream, nothing is spooled first.
+            upload = await open_multipart_file(request.stream(), content_type, "photo")
+            if upload is None: raise HTTPException(status_code=400, detail="Expected a 'photo' file field.")
+            content_type, chunks = upload.content_type, upload.chunks()
+        elif content_type.split(";")[0].strip() in ALLOWED_CONTENT_TYPES:
+            if content_length > MAX_PHOTO_BYTES: raise PhotoTooLarge()
+            chunks = request.stream()
+        elif content_length:
+            raise HTTPException(status_code=415, detail="Upload a JPEG, PNG, WebP or HEIC image.")
+        else:
+            chunks = None  # Older clients that only mark the task as done.
+        if chunks is not None:
+            if content_type.split(";")[0].strip() not in ALLOWED_CONTENT_TYPES: raise HTTPException(status_code=415, detail="Upload a JPEG, PNG, WebP or HEIC image.")
+            photo = await store_stream(chunks)
+    except PhotoTooLarge:
+        raise HTTPException(status_code=413, detail="Photo is too large.")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if photo:
+        if await run_in_threadpool(register_photo, db, photo, content_type.split(";")[0].strip()): photo_processor.schedule(photo.sha256)
+        data = photo_url(photo.sha256)
+    submission = await run_in_threadpool(crud.create_submission, db, student_id, task_id, data, "pending")
+    teacher_id = await run_in_threadpool(_teacher_of, db, student_id)
+    publish_submission(teacher_id, student_id, submission.id, "pending")
+    return {"message": "Submission received and awaiting teacher approval.", "photo": data if photo else None}
+
+# Originals keep their EXIF (capture time, GPS), so only teachers reviewing them get the file; the thumbnails
+# the review list links to are re-encoded without EXIF.
+@app.get("/api/photos/{sha256}", tags=["Submissions"], dependencies=[Depends(teacher_only)])
+def get_photo(sha256: str, db: Session = Depends(get_db)):
+    photo = db.get(models.Photo, sha256)
+    if not photo: raise HTTPException(status_code=404, detail="Photo not found")
+    return FileResponse(original_path(sha256), media_type=photo.content_type, headers={"Cache-Control": "private, max-age=31536000, immutable"})
+
+@app.get("/api/photos/{sha256}/thumbnail", tags=["Submissions"])
+def get_photo_thumbnail(sha256: str, db: Session = Depends(get_db)):
+    photo = db.get(models.Photo, sha256)
+    if not photo: raise HTTPException(status_code=404, detail="Photo not found")
+    if not photo.has_thumbnail:
+        if photo.status == "processing": return JSONResponse(status_code=202, content={"detail": "Thumbnail is being generated."}, headers={"Retry-After": "2"})
+        raise HTTPException(status_code=404, detail="No thumbnail for this photo")
+    return FileResponse(thumbnail_path(sha256), media_type="image/jpeg", headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
-@app.post("/api/student/{student_id}/submit/quiz/{task_id}", tags=["Submissions"])
+def _quiz_key(db: Session, task_id: uuid.UUID):
+    # Only quizzes with questions can be graded; anything else would score 0/0 and be approved.
+    key = answer_keys.get(db, task_id)
+    if not key or key.task_type != "quiz" or key.total == 0: raise HTTPException(status_code=404, detail="Quiz not found")
+    return key
+
+@app.post("/api/student/{student_id}/submit/quiz/{task_id}", tags=["Submissions"], dependencies=[Depends(student_access)])
 def submit_quiz_task(student_id: uuid.UUID, task_id: uuid.UUID, submission: QuizSubmission, db: Session = Depends(get_db)):
-    task = crud.get_task_by_id(db, task_id); student = crud.get_student_by_id(db, student_id); score = 0
-    total_questions = len(task.questions)
-    for q in task.questions:
-        if submission.answers.get(str(q.id)) == q.correct_answer: score += 1
-    if score == total_questions:
-        student.points += task.points_reward; status = 'approved'
-        badge = crud.get_badge_by_name(db, "Quiz Whiz"); first_steps_badge = crud.get_badge_by_name(db, "First Steps")
-        if badge: crud.award_badge_to_student(db, student, badge)
-        if first_steps_badge: crud.award_badge_to_student(db, student, first_steps_badge)
-    else: status = 'rejected'
-    crud.create_submission(db, student_id, task_id, f"Score: {score}/{total_questions}", status); db.commit()
-    return {"message": f"Quiz submitted! You scored {score}/{total_questions}.", "status": status}
+    key = _quiz_key(db, task_id)
+    score = key.grade(submission.answers)
+    result = crud.record_quiz_results(db, task_id, key.points_reward, [{"student_id": student_id, "score": score, "total": key.total}], badge_engine.awarder(QUIZ_GRADED))
+    status = result["results"][0]["status"]
+    if status == "student_not_found": raise HTTPException(status_code=404, detail="Student not found")
+    _points_changed(result["new_points"]); _badges_granted(result["badges_granted"])
+    publish_submission(result["teachers"].get(student_id), student_id, result["results"][0]["submission_id"], status)
+    return {"message": f"Quiz submitted! You scored {score}/{key.total}.", "status": status}
+
+@app.post("/api/quiz/{task_id}/grade-batch", tags=["Submissions"], dependencies=[Depends(teacher_only)])
+def grade_quiz_batch(task_id: uuid.UUID, batch: QuizBatchSubmission, db: Session = Depends(get_db)):
+    """ Grades many students' answer sheets for one quiz and saves every submission, point and badge in one transaction. """
+    key = _quiz_key(db, task_id)
+    sheets = [{"student_id": sheet.student_id, "score": key.grade(sheet.answers), "total": key.total} for sheet in batch.sheets]
+    result = crud.record_quiz_results(db, task_id, key.points_reward, sheets, badge_engine.awarder(QUIZ_GRADED))
+    _points_changed(result["new_points"]); _badges_granted(result["badges_granted"])
+    for r in result["results"]:
+        if "submission_id" in r: publish_submission(result["teachers"].get(r["student_id"]), r["student_id"], r["submission_id"], r["status"])
+    return {"graded": len(sheets), "results": result["results"]}
+
+# With a token, a teacher can only decide submissions from their own students (like the bulk review route).
+def _decide(db: Session, submission_id: uuid.UUID, status: str, identity: Optional[Identity]):
+    decided = crud.decide_submission(db, submission_id, status, teacher_id=identity.subject if identity else None)
+    if not decided: raise HTTPException(status_code=404, detail="Submission not found or already processed.")
+    return decided
 
 @app.post("/api/teacher/submissions/{submission_id}/approve", tags=["Submissions"])
-def approve_submission(submission_id: uuid.UUID, db: Session = Depends(get_db)):
-    submission = crud.get_submission_by_id(db, submission_id)
-    if not submission or submission.status != 'pending': raise HTTPException(status_code=404, detail="Submission not found or already processed.")
-    submission.status = 'approved'; submission.student.points += submission.task.points_reward
-    eco_warrior_badge = crud.get_badge_by_name(db, "Eco Warrior"); first_steps_badge = crud.get_badge_by_name(db, "First Steps")
-    if eco_warrior_badge: crud.award_badge_to_student(db, submission.student, eco_warrior_badge)
-    if first_steps_badge: crud.award_badge_to_student(db, submission.student, first_steps_badge)
+def approve_submission(submission_id: uuid.UUID, identity: Optional[Identity] = Depends(teacher_only), db: Session = Depends(get_db)):
+    decided = _decide(db, submission_id, 'approved', identity)
+    new_points = crud.credit_points(db, {decided.student_id: crud.get_points_reward(db, decided.task_id)}, reason='photo_approval')
+    crud.bump_student_stats(db, {decided.student_id: {"pending": -1, "approved": 1}})
+    badges = badge_engine.evaluate(db, PHOTO_APPROVED, [decided.student_id])
     db.commit()
+    _points_changed(new_points); _badges_granted(badges)
+    publish_submission(_teacher_of(db, decided.student_id), decided.student_id, decided.id, "approved")
     return {"message": "Submission approved and points awarded."}
 
 @app.post("/api/teacher/submissions/{submission_id}/reject", tags=["Submissions"])
-def reject_submission(submission_id: uuid.UUID, db: Session = Depends(get_db)):
-    submission = crud.get_submission_by_id(db, submission_id)
-    if not submission or submission.status != 'pending': raise HTTPException(status_code=404, detail="Submission not found or already processed.")
-    submission.status = 'rejected'; db.commit()
+def reject_submission(submission_id: uuid.UUID, identity: Optional[Identity] = Depends(teacher_only), db: Session = Depends(get_db)):
+    decided = _decide(db, submission_id, 'rejected', identity)
+    crud.bump_student_stats(db, {decided.student_id: {"pending": -1, "rejected": 1}}); db.commit()
+    publish_submission(_teacher_of(db, decided.student_id), decided.student_id, decided.id, "rejected")
     return {"message": "Submission rejected."}
 
+@app.post("/api/teacher/{teacher_id}/submissions/review", response_model=BulkReviewResponse, tags=["Submissions"], dependencies=[Depends(teacher_access)])
+def bulk_review_submissions(teacher_id: uuid.UUID, review: BulkReview, db: Session = Depends(get_db)):
+    """ Approves and rejects many pending submissions in one transaction. IDs that aren't pending or
+    don't belong to this teacher's students are returned in `skipped`. """
+    if set(review.approve) & set(review.reject): raise HTTPException(status_code=400, detail="A submission cannot be both approved and rejected.")
+    result = crud.bulk_review_submissions(db, teacher_id, review.approve, review.reject, badge_engine.awarder(PHOTO_APPROVED))
+    _points_changed(result["new_points"]); _badges_granted(result["badges_granted"])
+    for d in result["decisions"]: publish_submission(teacher_id, d["student_id"], d["submission_id"], d["status"])
+    return {**result, "badges_granted": len(result["badges_granted"])}
+
 # Content and Gamification Routes
 @app.get("/api/tasks", response_model=List[EcoTaskResponse], tags=["Content"])
-def get_all_tasks(db: Session = Depends(get_db)):
-    return crud.get_all_tasks(db)
+def get_all_tasks(request: Request, db: Session = Depends(get_db)):
+    # Served from the version-stamped catalog cache; clients revalidate with If-None-Match.
+    catalog = task_catalog.get(db)
+    headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+    if catalog.etag in request.headers.get("if-none-match", ""): return Response(status_code=304, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
 
-@app.post("/api/tasks", status_code=status.HTTP_201_CREATED, tags=["Content"])
+@app.post("/api/tasks", status_code=status.HTTP_201_CREATED, tags=["Content"], dependencies=[Depends(teacher_only)])
 def create_task(task: TaskCreate, db: Session = Depends(get_db)):
-    return crud.create_eco_task(db=db, title=task.title, description=task.description, points_reward=task.points_reward, task_type=task.task_type)
+    new_task = crud.create_eco_task(db=db, title=task.title, description=task.description, points_reward=task.points_reward, task_type=task.task_type)
+    task_catalog.invalidate(); answer_keys.invalidate(new_task.id)
+    return new_task
 
-@app.post("/api/quiz", status_code=status.HTTP_201_CREATED, tags=["Content"])
+@app.post("/api/quiz", status_code=status.HTTP_201_CREATED, tags=["Content"], dependencies=[Depends(teacher_only)])
 def create_full_quiz(quiz_data: QuizCreate, db: Session = Depends(get_db)):
-    return crud.create_quiz_with_questions(db=db, quiz_data=quiz_data)
+    quiz_task = crud.create_quiz_with_questions(db=db, quiz_data=quiz_data)
+    task_catalog.invalidate(); answer_keys.invalidate(quiz_task.id)
+    return quiz_task
+
+# Leaderboard sizes are clamped like list page sizes: at least 1, at most MAX_BOARD_LIMIT.
+MAX_BOARD_LIMIT = 100
+
+def _board_limit(limit: int) -> int:
+    if limit < 1: raise HTTPException(status_code=400, detail="limit must be at least 1")
+    return min(limit, MAX_BOARD_LIMIT)
 
 @app.get("/api/leaderboard", response_model=List[StudentProfileResponse], tags=["Gamification"])
-def get_leaderboard(db: Session = Depends(get_db)):
-    return crud.get_leaderboard(db)
\ No newline at end of file
+def get_leaderboard(limit: int = 10, db: Session = Depends(get_db)):
+    limit = _board_limit(limit)
+    body = response_cache.board(limit)
+    if body is None:
+        version = response_cache.version
+        leaderboard.ensure_seeded(db)
+        top = leaderboard.top(limit)
+        body = dumps(profile_payloads(*crud.get_student_profile_rows(db, [e["id"] for e in top])))
+        response_cache.put_board(limit, body, version, {e["id"]: e["points"] for e in top})
+    return json_response(body)
+
+@app.get("/api/leaderboard/class/{class_name}", response_model=List[LeaderboardEntryResponse], tags=["Gamification"])
+def get_class_leaderboard(class_name: str, limit: int = 10, db: Session = Depends(get_db)):
+    leaderboard.ensure_seeded(db)
+    return leaderboard.top(_board_limit(limit), class_name=class_name)
+
+@app.get("/api/leaderboard/teacher/{teacher_id}", response_model=List[LeaderboardEntryResponse], tags=["Gamification"])
+def get_teacher_leaderboard(teacher_id: uuid.UUID, limit: int = 10, db: Session = Depends(get_db)):
+    leaderboard.ensure_seeded(db)
+    return leaderboard.top(_board_limit(limit), teacher_id=teacher_id)
+
+@app.get("/api/leaderboard/{period}", response_model=List[WindowedLeaderboardEntryResponse], tags=["Gamification"])
+def get_windowed_leaderboard(period: str, limit: int = 10, class_name: Optional[str] = None, teacher_id: Optional[uuid.UUID] = None, db: Session = Depends(get_db)):
+    """ Top students by points earned today (`day`) or this week (`week`), optionally within a class or teacher. """
+    if period not in PERIODS: raise HTTPException(status_code=404, detail="Unknown leaderboard period")
+    return crud.get_windowed_leaderboard(db, period, _board_limit(limit), class_name=class_name, teacher_id=teacher_id)
+
+@app.get("/api/student/{student_id}/progress", response_model=List[ProgressPointResponse], tags=["Gamification"], dependencies=[Depends(student_access)])
+def get_student_progress(student_id: uuid.UUID, period: str = "day", buckets: int = 30, db: Session = Depends(get_db)):
+    """ Points earned per day or week, for progress charts. """
+    if period not in PERIODS: raise HTTPException(status_code=400, detail="period must be 'day' or 'week'")
+    return crud.get_student_progress(db, student_id, period, max(1, min(buckets, 366)))
+
+@app.get("/api/student/{student_id}/rank", response_model=StudentStandingResponse, tags=["Gamification"])
+def get_student_rank(student_id: uuid.UUID, radius: int = 2, scope: str = "global", db: Session = Depends(get_db)):
+    """ A student's rank plus the students just above and below them. `scope` is 'global', 'class' or 'teacher'. """
+    leaderboard.ensure_seeded(db)
+    me = leaderboard.standing(student_id, radius=0)
+    if not me: raise HTTPException(status_code=404, detail="Student not found")
+    entry = me["student"]
+    if scope == "class": standing = leaderboard.standing(student_id, radius, class_name=entry["class_name"])
+    elif scope == "teacher": standing = leaderboard.standing(student_id, radius, teacher_id=entry["teacher_id"])
+    else: standing = leaderboard.standing(student_id, radius)
+    if not standing: raise HTTPException(status_code=404, detail="Student is not ranked on this board")
+    return standing
+
+
+# --- Live Updates ---
+# Browsers can't set headers on WebSocket/EventSource requests, so the token comes as a query parameter.
+LIVE_PING_SECONDS = 25
+LIVE_SEND_TIMEOUT_SECONDS = 10
+
+def _live_topics(token: Optional[str], teacher_id: Optional[uuid.UUID], student_id: Optional[uuid.UUID], include_leaderboard: bool):
+    # Same rule as the HTTP routes: while auth is optional, a token this instance can't verify is anonymous.
+    identity = identity_from_token(token)
+    topics = []
+    if teacher_id:
+        if identity and not (identity.role == "teacher" and identity.subject == teacher_id): raise HTTPException(status_code=403, detail="Not allowed to follow this teacher")
+        topics.append(teacher_topic(teacher_id))
+    if student_id:
+        if identity and not (identity.role == "teacher" or identity.subject == student_id): raise HTTPException(status_code=403, detail="Not allowed to follow this student")
+        topics.append(student_topic(student_id))
+    if include_leaderboard: topics.append(LEADERBOARD_TOPIC)
+    if not topics: raise HTTPException(status_code=400, detail="Nothing to subscribe to")
+    return topics
+
+@app.websocket("/api/live/ws")
+async def live_websocket(websocket: WebSocket, token: Optional[str] = None, teacher_id: Optional[uuid.UUID] = None, student_id: Optional[uuid.UUID] = None, leaderboard_updates: bool = True):
+    """ Sends JSON arrays of events; an empty batch is replaced by a ping every LIVE_PING_SECONDS. """
+    try:
+        topics = _live_topics(token, teacher_id, student_id, leaderboard_updates)
+    except HTTPException as e:
+        await websocket.close(code=4000 + e.status_code); return
+    await websocket.accept()
+    sub = hub.subscribe(topics)
+    try:
+        while True:
+            batch = await sub.next_batch(timeout=LIVE_PING_SECONDS) or [{"type": "ping"}]
+            # A client that can't take a batch in time is dropped; its backlog never reaches other connections.
+            await asyncio.wait_for(websocket.send_text(json.dumps(batch)), LIVE_SEND_TIMEOUT_SECONDS)
+    except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+        pass
+    finally:
+        sub.close()
+
+@app.get("/api/live/events", tags=["Live"])
+async def live_events(request: Request, token: Optional[str] = None, teacher_id: Optional[uuid.UUID] = None, student_id: Optional[uuid.UUID] = None, leaderboard_updates: bool = True):
+    """ Server-Sent Events version of /api/live/ws for clients that only need one-way updates. """
+    topics = _live_topics(token, teacher_id, student_id, leaderboard_updates)
+    sub = hub.subscribe(topics)
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                batch = await sub.next_batch(timeout=LIVE_PING_SECONDS)
+                yield encode_sse(batch) if batch else ": ping\n\n"
+        finally:
+            sub.close()
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# --- Debug Endpoints (opt-in) ---
+# Pool, cache, live-hub and startup metrics are only served with ECOQUEST_DEBUG_ENDPOINTS=1 (as /api/debug/sql
+# is only served with ECOQUEST_SQL_PROFILE=1), and then only to teachers once clients send tokens.
+DEBUG_ENDPOINTS_ENABLED = os.getenv("ECOQUEST_DEBUG_ENDPOINTS", "").lower() in ("1", "true", "yes")
+
+# Measured once the whole module (routes included) has been imported.
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
+if DEBUG_ENDPOINTS_ENABLED:
+    @app.get("/api/debug/startup", tags=["Debug"], dependencies=[Depends(teacher_only)])
+    def startup_metrics():
+        """ How long importing the app took in this process, for cold-start tracking. """
+        return {"import_seconds": round(IMPORT_SECONDS, 4), "uptime_seconds": round(time.perf_counter() - _import_started, 1)}
+
+    @app.get("/api/debug/password-pool", tags=["Debug"], dependencies=[Depends(teacher_only)])
+    def password_pool_metrics():
+        """ Queue depth and timings for the bcrypt pool. """
+        return password_hasher.metrics()
+
+    @app.get("/api/debug/live", tags=["Debug"], dependencies=[Depends(teacher_only)])
+    def live_metrics():
+        return hub.metrics()
+
+    @app.get("/api/debug/response-cache", tags=["Debug"], dependencies=[Depends(teacher_only)])
+    def response_cache_metrics():
+        return response_cache.metrics()
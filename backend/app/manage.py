@@ -0,0 +1,68 @@
+import argparse
+import time
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from . import crud, ledger, models
+from .badges import badge_engine
+from .database import engine
+
+# One-shot maintenance commands, run from backend/:
+#   python -m app.manage init-db         create missing tables and indexes, seed the demo badges/tasks
+#                                        (and fill student_stats from history when that table is new)
+#   python -m app.manage rebuild-stats   recompute the per-student submission counters from history
+#   python -m app.manage compact-ledger  fold old points_ledger rows and drop expired day rollups
+#   python -m app.manage backfill-badges [--badge NAME]  grant badges (e.g. a newly added rule's) to students who already qualify
+
+
+def init_db():
+    started = time.perf_counter()
+    existing_tables = set(inspect(engine).get_table_names())
+    models.Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so indexes added to existing tables are created here.
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes: index.create(bind=engine, checkfirst=True)
+    with Session(engine) as db:
+        crud.add_initial_data(db)
+        badge_engine.registry.sync(db)
+        # Counters only move by deltas, so a database upgraded with submissions already in it needs them backfilled.
+        if models.StudentStats.__tablename__ not in existing_tables: crud.rebuild_student_stats(db)
+    print(f"Schema created and initial data seeded in {time.perf_counter() - started:.2f}s")
+
+
+def rebuild_stats():
+    started = time.perf_counter()
+    with Session(engine) as db:
+        count = crud.rebuild_student_stats(db)
+    print(f"Rebuilt submission counters for {count} students in {time.perf_counter() - started:.2f}s")
+
+
+def compact_ledger():
+    started = time.perf_counter()
+    with Session(engine) as db:
+        result = ledger.compact_ledger(db)
+    print(f"Compacted points ledger in {time.perf_counter() - started:.2f}s: {result}")
+
+
+def backfill_badges(badge=None):
+    started = time.perf_counter()
+    with Session(engine) as db:
+        granted = badge_engine.backfill(db, badge)
+    print(f"Granted {granted} badges in {time.perf_counter() - started:.2f}s")
+
+
+COMMANDS = {"init-db": init_db, "rebuild-stats": rebuild_stats, "compact-ledger": compact_ledger, "backfill-badges": backfill_badges}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="EcoQuest maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--badge", help="backfill-badges: only this badge's rule")
+    args = parser.parse_args(argv)
+    if args.command == "backfill-badges": backfill_badges(args.badge)
+    else: COMMANDS[args.command]()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, UUID as UUID_COLUMN, Table
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Float, Boolean, func, UUID as UUID_COLUMN, Table, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 import uuid
+from datetime import datetime
 
 # Association Table for Many-to-Many relationship between Students and Badges
 student_badge_association = Table(
@@ -27,11 +28,13 @@ class Student(Base):
     full_name = Column(String, nullable=False)
     class_name = Column(String) # Correctly added field
     teacher_id = Column(UUID_COLUMN(as_uuid=True), ForeignKey("users.id"))
-    points = Column(Integer, default=0)
+    points = Column(Integer, default=0, index=True)
     created_at = Column(DateTime, default=func.now())
     teacher = relationship("User", back_populates="students")
     submissions = relationship("StudentSubmission", back_populates="student")
     badges = relationship("Badge", secondary=student_badge_association, back_populates="students")
+    # Roster pages are keyset-paginated on (full_name, id) within a teacher.
+    __table_args__ = (Index("ix_students_teacher_name", "teacher_id", "full_name", "id"),)
 
 class EcoTask(Base):
     __tablename__ = "eco_tasks"
@@ -60,9 +63,16 @@ class StudentSubmission(Base):
     task_id = Column(UUID_COLUMN(as_uuid=True), ForeignKey("eco_tasks.id"))
     submission_data = Column(String) # For photo tasks, a placeholder URL. For quizzes, the score.
     status = Column(String, default='pending') # pending, approved, rejected
-    submitted_at = Column(DateTime, default=func.now())
+    # Set in Python, not by the database's now(): SQLite's CURRENT_TIMESTAMP drops the microseconds, so rows from the
+    # same second would never compare equal to a (submitted_at, id) cursor and keyset pages would repeat or skip rows.
+    submitted_at = Column(DateTime, default=datetime.utcnow)
     student = relationship("Student", back_populates="submissions")
     task = relationship("EcoTask")
+    # Submission histories and review queues are keyset-paginated on (submitted_at, id).
+    __table_args__ = (
+        Index("ix_student_submissions_student_submitted", "student_id", "submitted_at", "id"),
+        Index("ix_student_submissions_status_submitted", "status", "submitted_at", "id"),
+    )
 
 class Badge(Base):
     __tablename__ = "badges"
@@ -70,4 +80,56 @@ class Badge(Base):
     name = Column(String, unique=True, nullable=False)
     description = Column(String)
     icon_url = Column(String) # URL to an emoji or image
-    students = relationship("Student", secondary=student_badge_association, back_populates="badges")
\ No newline at end of file
+    students = relationship("Student", secondary=student_badge_association, back_populates="badges")
+
+class StudentStats(Base):
+    # Per-student submission counters kept current by the submission write paths, so the teacher
+    # dashboard never has to GROUP BY over submission history. Rebuild with `python -m app.manage rebuild-stats`.
+    __tablename__ = "student_stats"
+    student_id = Column(UUID_COLUMN(as_uuid=True), ForeignKey("students.id"), primary_key=True)
+    pending_count = Column(Integer, nullable=False, default=0)
+    approved_count = Column(Integer, nullable=False, default=0)
+    rejected_count = Column(Integer, nullable=False, default=0)
+    last_activity_at = Column(DateTime)
+
+class PointsLedger(Base):
+    # Append-only record of every points credit. students.points stays the running total; the ledger is
+    # what the rollups and audits are built from. Old rows are folded together by app.ledger.compact_ledger.
+    __tablename__ = "points_ledger"
+    id = Column(UUID_COLUMN(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    student_id = Column(UUID_COLUMN(as_uuid=True), ForeignKey("students.id"), nullable=False)
+    delta = Column(Integer, nullable=False)
+    reason = Column(String, nullable=False) # 'quiz', 'photo_approval', 'compacted'
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    __table_args__ = (Index("ix_points_ledger_student_created", "student_id", "created_at"), Index("ix_points_ledger_created", "created_at"))
+
+class PointsRollup(Base):
+    # Points earned per student per day/week bucket, maintained in the same transaction as each credit.
+    # class_name/teacher_id are copied in so windowed class and teacher boards are a single index range read.
+    __tablename__ = "points_rollups"
+    student_id = Column(UUID_COLUMN(as_uuid=True), ForeignKey("students.id"), primary_key=True)
+    bucket_kind = Column(String, primary_key=True) # 'day' or 'week'
+    bucket_start = Column(Date, primary_key=True)
+    class_name = Column(String)
+    teacher_id = Column(UUID_COLUMN(as_uuid=True))
+    points = Column(Integer, nullable=False, default=0)
+    __table_args__ = (
+        Index("ix_points_rollups_bucket_points", "bucket_kind", "bucket_start", "points"),
+        Index("ix_points_rollups_class_bucket", "class_name", "bucket_kind", "bucket_start", "points"),
+        Index("ix_points_rollups_teacher_bucket", "teacher_id", "bucket_kind", "bucket_start", "points"),
+    )
+
+class Photo(Base):
+    # Uploaded photo evidence, stored on disk under its SHA-256 (see app/photos.py). Identical uploads share a row.
+    __tablename__ = "photos"
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    content_type = Column(String)
+    status = Column(String, nullable=False, default='processing') # processing, ready, failed
+    has_thumbnail = Column(Boolean, nullable=False, default=False)
+    width = Column(Integer)
+    height = Column(Integer)
+    taken_at = Column(DateTime)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    created_at = Column(DateTime, default=func.now())
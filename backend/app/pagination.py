@@ -0,0 +1,87 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Callable, Iterable, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .serialization import dumps
+
+# Keyset pagination and NDJSON streaming for list endpoints.
+# A cursor is the sort key of the last row on a page, e.g. (submitted_at, id), so the next page is an
+# index range scan that starts right after it instead of an OFFSET that re-reads everything before it.
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_ROWS = 500
+
+
+def _encode_value(value):
+    if isinstance(value, datetime): return {"dt": value.isoformat()}
+    if isinstance(value, uuid.UUID): return {"uuid": str(value)}
+    return value
+
+
+_TAGGED = {datetime: ("dt", datetime.fromisoformat), uuid.UUID: ("uuid", uuid.UUID)}
+
+
+def _decode_value(value, expected: type):
+    # Cursors come from clients, so every value is checked against the type of the column it will be compared with.
+    if expected in _TAGGED:
+        tag, parse = _TAGGED[expected]
+        if not (isinstance(value, dict) and isinstance(value.get(tag), str)): raise ValueError(f"expected a {tag} value")
+        return parse(value[tag])
+    if not isinstance(value, expected): raise ValueError(f"expected a {expected.__name__} value")
+    return value
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> list:
+    """ Decodes a cursor for a sort key of `types`, e.g. (datetime, uuid.UUID); anything else is a 400. """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types): raise ValueError()
+        return [_decode_value(v, t) for v, t in zip(values, types)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_after(columns: Sequence, values: Sequence, descending: bool = False):
+    """ WHERE clause for rows strictly after `values` in (columns...) order, written out as OR/AND so it
+    works on every backend (row-value comparison isn't portable). """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        step = column < value if descending else column > value
+        clauses.append(and_(*[c == v for c, v in zip(columns[:i], values[:i])], step))
+    return or_(*clauses)
+
+
+def page_size(limit: int) -> int:
+    if limit < 1: raise HTTPException(status_code=400, detail="limit must be at least 1")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def ndjson_response(rows_for: Callable[[Session], Iterable], to_dict: Callable[[object], dict]) -> StreamingResponse:
+    """ Streams rows as NDJSON. The generator owns its own session because request-scoped dependencies are
+    closed before a streaming body finishes; rows come from a server-side cursor in fixed-size chunks. """
+    def generate():
+        db = SessionLocal()
+        try:
+            buffer = []
+            for row in rows_for(db):
+                buffer.append(dumps(to_dict(row)))
+                if len(buffer) >= STREAM_CHUNK_ROWS:
+                    yield b"\n".join(buffer) + b"\n"; buffer = []
+            if buffer: yield b"\n".join(buffer) + b"\n"
+        finally:
+            db.close()
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .database import SessionLocal
+
+try:
+    from python_multipart.multipart import MultipartParseError, MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParseError, MultipartParser, parse_options_header
+
+# Photo ingestion for photo tasks.
+# Uploads are streamed to disk in CHUNK_SIZE pieces while being hashed, then stored under their SHA-256
+# (content-addressed), so identical files are kept once. Multipart forms are parsed off the request stream as
+# it arrives, so the photo part goes through the same path and is never spooled to disk in full first.
+# Thumbnails and EXIF/geotag data are produced by a worker pool after the request has returned; review lists
+# only ever link to the thumbnail, which carries no EXIF. The pool is threads by default, which works on
+# serverless hosts that can't fork; long-running servers can set ECOQUEST_PHOTO_WORKERS=N for N processes.
+# Thumbnailing needs Pillow; without it photos are still stored and marked 'ready' with no thumbnail.
+
+PHOTO_ROOT = os.getenv("ECOQUEST_PHOTO_ROOT", os.path.join(os.path.dirname(os.path.dirname(__file__)), "media"))
+CHUNK_SIZE = 64 * 1024
+MAX_PHOTO_BYTES = int(os.getenv("ECOQUEST_MAX_PHOTO_BYTES", str(15 * 1024 * 1024)))
+THUMBNAIL_SIZE = (320, 320)
+PHOTO_WORKERS = int(os.getenv("ECOQUEST_PHOTO_WORKERS", "0"))
+PHOTO_THREADS = 2
+ALLOWED_CONTENT_TYPES = {"image/jpeg", "image/png", "image/webp", "image/heic"}
+# Room for part headers, boundaries and small form fields around the photo in a multipart body.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoTooLarge(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredPhoto:
+    sha256: str
+    size: int
+    deduplicated: bool
+
+
+def original_path(sha256: str) -> str:
+    return os.path.join(PHOTO_ROOT, "originals", sha256[:2], sha256[2:4], sha256)
+
+
+def thumbnail_path(sha256: str) -> str:
+    return os.path.join(PHOTO_ROOT, "thumbnails", sha256[:2], sha256[2:4], sha256 + ".jpg")
+
+
+def photo_url(sha256: str) -> str:
+    return f"/api/photos/{sha256}"
+
+
+def thumbnail_url_for(submission_data: Optional[str]) -> Optional[str]:
+    # Photo submissions store photo_url() in submission_data.
+    if submission_data and submission_data.startswith("/api/photos/"): return submission_data + "/thumbnail"
+    return None
+
+
+# --- Streaming storage ---
+def _write_chunk(f, chunk: bytes):
+    f.write(chunk)
+
+
+async def store_stream(chunks: AsyncIterator[bytes]) -> StoredPhoto:
+    """ Writes the stream to a temp file in fixed-size chunks while hashing it, then moves it to its
+    content address. If that address already exists the new copy is discarded. """
+    tmp_dir = os.path.join(PHOTO_ROOT, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=tmp_dir)
+    digest = hashlib.sha256(); size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                for i in range(0, len(chunk), CHUNK_SIZE):
+                    piece = chunk[i:i + CHUNK_SIZE]
+                    size += len(piece)
+                    if size > MAX_PHOTO_BYTES: raise PhotoTooLarge()
+                    digest.update(piece)
+                    await run_in_threadpool(_write_chunk, f, piece)
+        sha256 = digest.hexdigest()
+        final = original_path(sha256)
+        if os.path.exists(final):
+            os.unlink(tmp)
+            return StoredPhoto(sha256, size, deduplicated=True)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.replace(tmp, final)
+        return StoredPhoto(sha256, size, deduplicated=False)
+    except BaseException:
+        if os.path.exists(tmp): os.unlink(tmp)
+        raise
+
+
+# --- Multipart uploads ---
+class MultipartFile:
+    """ One file field of a multipart/form-data body, read incrementally from the request stream.
+    open() reads up to the start of the field's part (skipping other parts); chunks() then yields its bytes. """
+
+    def __init__(self, chunks: AsyncIterator[bytes], boundary: bytes, field: str):
+        self.field = field
+        self.content_type = ""
+        self._chunks = chunks
+        self._events = []
+        self._headers: Dict[bytes, bytes] = {}
+        self._header = [b"", b""]
+
+        def header_field(data, start, end): self._header[0] += data[start:end]
+        def header_value(data, start, end): self._header[1] += data[start:end]
+        def header_end():
+            self._headers[self._header[0].lower()] = self._header[1]; self._header = [b"", b""]
+        def headers_finished():
+            self._events.append(("headers", self._headers)); self._headers = {}
+        self._parser = MultipartParser(boundary, {
+            "on_header_field": header_field, "on_header_value": header_value, "on_header_end": header_end,
+            "on_headers_finished": headers_finished,
+            "on_part_data": lambda data, start, end: self._events.append(("data", bytes(data[start:end]))),
+            "on_part_end": lambda: self._events.append(("end", None)),
+        })
+        self._stream = self._parse()
+
+    async def _parse(self):
+        received = 0
+        async for chunk in self._chunks:
+            received += len(chunk)
+            if received > MAX_PHOTO_BYTES + MULTIPART_OVERHEAD_BYTES: raise PhotoTooLarge()
+            try:
+                self._parser.write(chunk)
+            except MultipartParseError as e:
+                raise ValueError(f"Malformed multipart body: {e}")
+            events, self._events = self._events, []
+            for event in events: yield event
+
+    async def open(self) -> bool:
+        async for kind, value in self._stream:
+            if kind != "headers": continue
+            _, params = parse_options_header(value.get(b"content-disposition", b""))
+            if params.get(b"name") == self.field.encode() and b"filename" in params:
+                self.content_type = value.get(b"content-type", b"").decode("latin-1")
+                return True
+        return False
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        async for kind, value in self._stream:
+            if kind == "data": yield value
+            elif kind == "end": return
+        raise ValueError("Malformed multipart body: it ended inside the file")
+
+
+async def open_multipart_file(chunks: AsyncIterator[bytes], content_type: str, field: str) -> Optional[MultipartFile]:
+    """ Returns the form's `field` file, positioned at its first byte, or None if the form has no such file.
+    Raises ValueError for a malformed body and PhotoTooLarge once the body outgrows any acceptable photo. """
+    _, params = parse_options_header(content_type)
+    if not params.get(b"boundary"): raise ValueError("Malformed multipart body: no boundary")
+    upload = MultipartFile(chunks, params[b"boundary"], field)
+    return upload if await upload.open() else None
+
+
+# --- Off-request processing (runs on the worker pool) ---
+def _gps_to_degrees(values, ref) -> Optional[float]:
+    try:
+        degrees = float(values[0]) + float(values[1]) / 60 + float(values[2]) / 3600
+    except (TypeError, ValueError, IndexError, ZeroDivisionError):
+        return None
+    return -degrees if ref in ("S", "W") else degrees
+
+
+def process_photo(source: str, thumb: str) -> dict:
+    """ Makes the thumbnail and pulls capture time and GPS position from EXIF. """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return {}
+    with Image.open(source) as img:
+        meta = {"width": img.width, "height": img.height}
+        exif = img.getexif()
+        taken = exif.get_ifd(0x8769).get(0x9003) or exif.get(0x0132)  # DateTimeOriginal, else DateTime
+        if taken:
+            try: meta["taken_at"] = datetime.strptime(str(taken), "%Y:%m:%d %H:%M:%S")
+            except ValueError: pass
+        gps = exif.get_ifd(0x8825)
+        if gps.get(2) and gps.get(4):
+            meta["latitude"] = _gps_to_degrees(gps[2], gps.get(1))
+            meta["longitude"] = _gps_to_degrees(gps[4], gps.get(3))
+        thumbnail = ImageOps.exif_transpose(img).convert("RGB")
+        thumbnail.thumbnail(THUMBNAIL_SIZE)
+        os.makedirs(os.path.dirname(thumb), exist_ok=True)
+        thumbnail.save(thumb + ".part", "JPEG", quality=80)
+        os.replace(thumb + ".part", thumb)
+        meta["has_thumbnail"] = True
+    return meta
+
+
+class PhotoProcessor:
+    def __init__(self, workers: int = PHOTO_WORKERS):
+        self.workers = workers
+        self._executor: Optional[Executor] = None
+        self._tasks = set()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers) if self.workers > 0 else ThreadPoolExecutor(PHOTO_THREADS, thread_name_prefix="photos")
+        return self._executor
+
+    def schedule(self, sha256: str):
+        """ Queues thumbnailing/EXIF extraction without making the caller wait for it. """
+        task = asyncio.get_running_loop().create_task(self._process(sha256))
+        self._tasks.add(task); task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, sha256: str):
+        loop = asyncio.get_running_loop()
+        try:
+            meta = await loop.run_in_executor(self._get_executor(), process_photo, original_path(sha256), thumbnail_path(sha256))
+            status = "ready"
+        except Exception:
+            logger.exception("Processing photo %s failed", sha256)
+            meta, status = {}, "failed"
+        await run_in_threadpool(_save_metadata, sha256, status, meta)
+
+    def shutdown(self):
+        if self._executor is not None: self._executor.shutdown(wait=False)
+
+
+def _save_metadata(sha256: str, status: str, meta: dict):
+    with SessionLocal() as db:
+        photo = db.get(models.Photo, sha256)
+        if not photo: return
+        photo.status = status
+        photo.has_thumbnail = bool(meta.get("has_thumbnail"))
+        for field in ("width", "height", "taken_at", "latitude", "longitude"):
+            if meta.get(field) is not None: setattr(photo, field, meta[field])
+        db.commit()
+
+
+def register_photo(db: Session, stored: StoredPhoto, content_type: Optional[str]) -> bool:
+    """ Records the photo row if it's new. Returns True when it still needs processing. """
+    photo = db.get(models.Photo, stored.sha256)
+    if photo: return photo.status == "failed"
+    db.add(models.Photo(sha256=stored.sha256, size=stored.size, content_type=content_type, status="processing"))
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same file arrived concurrently and the other request registered it first.
+        db.rollback()
+        return False
+    return True
+
+
+photo_processor = PhotoProcessor()
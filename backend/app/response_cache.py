@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Short-TTL cache of encoded response bodies for the hottest reads: student profiles (with badges) and the
+# global leaderboard. Entries are per entity and are dropped as soon as a write touches them: a points change
+# drops that student's profile and every cached board the student is on or could now enter; a badge grant
+# drops the profile and the boards showing the student. Invalidations are per process. Across processes a
+# cached profile is at most the TTL old. A cached board is built from the in-memory leaderboard, which only
+# rebuilds from the database every ECOQUEST_LEADERBOARD_REFRESH_SECONDS, so a write made by another process can
+# take up to that refresh interval plus the TTL to appear. ECOQUEST_RESPONSE_CACHE_TTL=0 turns the cache off.
+
+RESPONSE_CACHE_TTL = float(os.getenv("ECOQUEST_RESPONSE_CACHE_TTL", "5"))
+MAX_CACHED_PROFILES = 10_000
+MAX_CACHED_BOARD_LIMIT = 100
+
+
+@dataclass(frozen=True)
+class _Entry:
+    expires: float
+    body: bytes
+
+
+@dataclass(frozen=True)
+class _Board(_Entry):
+    members: frozenset
+    floor: Optional[int]  # lowest points on a full board; None when the board has room, so anyone can enter
+
+
+class ResponseCache:
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0
+        self._profiles: Dict[str, _Entry] = {}
+        self._boards: Dict[int, _Board] = {}
+        self.hits = self.misses = 0
+
+    @property
+    def version(self) -> int:
+        """ Read before loading; put_*() with a stale version is ignored, so a load that raced with a write isn't cached. """
+        return self._version
+
+    def _fresh(self, entry) -> Optional[bytes]:
+        if entry is not None and entry.expires > time.monotonic():
+            self.hits += 1
+            return entry.body
+        self.misses += 1
+        return None
+
+    # --- Reads and fills ---
+    def profile(self, student_id) -> Optional[bytes]:
+        if self.ttl <= 0: return None
+        return self._fresh(self._profiles.get(str(student_id)))
+
+    def put_profile(self, student_id, body: bytes, version: int):
+        if self.ttl <= 0: return
+        with self._lock:
+            if version != self._version: return
+            if len(self._profiles) >= MAX_CACHED_PROFILES:
+                now = time.monotonic()
+                self._profiles = {k: e for k, e in self._profiles.items() if e.expires > now}
+                if len(self._profiles) >= MAX_CACHED_PROFILES: self._profiles.clear()
+            self._profiles[str(student_id)] = _Entry(time.monotonic() + self.ttl, body)
+
+    def board(self, limit: int) -> Optional[bytes]:
+        if self.ttl <= 0: return None
+        return self._fresh(self._boards.get(limit))
+
+    def put_board(self, limit: int, body: bytes, version: int, points_by_member: dict):
+        if self.ttl <= 0 or limit < 1 or limit > MAX_CACHED_BOARD_LIMIT: return
+        floor = min(points_by_member.values()) if points_by_member and len(points_by_member) >= limit else None
+        with self._lock:
+            if version != self._version: return
+            self._boards[limit] = _Board(time.monotonic() + self.ttl, body, frozenset(str(i) for i in points_by_member), floor)
+
+    # --- Invalidation ---
+    def points_changed(self, new_points: dict):
+        if not new_points: return
+        changed = {str(i): p for i, p in new_points.items()}
+        with self._lock:
+            self._version += 1
+            for sid in changed: self._profiles.pop(sid, None)
+            self._boards = {limit: b for limit, b in self._boards.items() if b.floor is not None
+                            and b.members.isdisjoint(changed) and all((p or 0) < b.floor for p in changed.values())}
+
+    def badges_changed(self, student_ids):
+        ids = {str(i) for i in student_ids}
+        if not ids: return
+        with self._lock:
+            self._version += 1
+            for sid in ids: self._profiles.pop(sid, None)
+            self._boards = {limit: b for limit, b in self._boards.items() if b.members.isdisjoint(ids)}
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._profiles.clear(); self._boards.clear()
+
+    def metrics(self) -> dict:
+        return {"ttl_seconds": self.ttl, "profiles": len(self._profiles), "boards": len(self._boards), "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache()
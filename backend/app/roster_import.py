@@ -0,0 +1,128 @@
+import csv
+import json
+import time
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from . import crud, models
+
+# Streaming bulk roster import.
+# The upload is read chunk by chunk, parsed line by line and written in fixed-size batches, so apart from
+# the set of ID cards used to catch duplicates within the upload, memory is bounded by BATCH_SIZE.
+# Each batch is one multi-row INSERT ... ON CONFLICT (student_id_card) DO NOTHING RETURNING and one commit, so
+# ID cards that already exist (including ones another request inserts concurrently) are reported, not raised.
+# Bad rows, including lines that aren't valid UTF-8, are rejected one by one and the import carries on.
+
+BATCH_SIZE = 1000
+MAX_REPORTED_REJECTIONS = 1000
+REQUIRED_FIELDS = ("student_id_card", "full_name", "class_name")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """ Yields (line_number, raw_line) from a byte stream without holding more than one partial line. """
+    buffer = b""; line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            line_no += 1
+            yield line_no, raw
+    if buffer:
+        yield line_no + 1, buffer
+
+
+def decode_line(line_no: int, raw: bytes) -> str:
+    # Raises UnicodeDecodeError (a ValueError) for a line that isn't UTF-8; a BOM is allowed on the first line.
+    return raw.decode("utf-8-sig" if line_no == 1 else "utf-8").rstrip("\r")
+
+
+class RowParser:
+    """ Turns CSV (with a header row) or NDJSON lines into dicts of the required fields. """
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+
+    def parse(self, line: str) -> Optional[Dict[str, str]]:
+        if self.fmt == "ndjson":
+            record = json.loads(line)
+            if not isinstance(record, dict): raise ValueError("Each line must be a JSON object")
+            return record
+        values = next(csv.reader([line]))
+        if self.header is None:
+            header = [h.strip().lower() for h in values]
+            missing = [f for f in REQUIRED_FIELDS if f not in header]
+            if missing: raise ValueError(f"CSV header is missing columns: {', '.join(missing)}")
+            self.header = header
+            return None
+        return dict(zip(self.header, values))
+
+
+class ImportReport:
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.rejections: List[dict] = []
+        self.batches = 0
+        self.started = time.perf_counter()
+
+    def reject(self, line: int, student_id_card: Optional[str], reason: str):
+        self.rejected += 1
+        if len(self.rejections) < MAX_REPORTED_REJECTIONS:
+            self.rejections.append({"line": line, "student_id_card": student_id_card, "reason": reason})
+
+    def as_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        total = self.accepted + self.rejected
+        return {
+            "accepted": self.accepted, "rejected": self.rejected, "rejections": self.rejections,
+            "rejections_truncated": self.rejected > len(self.rejections),
+            "rows": total, "batches": self.batches, "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(total / elapsed, 1) if elapsed else None,
+        }
+
+
+def _insert_batch(db: Session, teacher_id: uuid.UUID, batch: List[Tuple[int, dict]], report: ImportReport):
+    students = models.Student.__table__
+    stmt = crud.dialect_insert(db, students).values([{
+        "id": uuid.uuid4(), "student_id_card": row["student_id_card"], "full_name": row["full_name"],
+        "class_name": row["class_name"], "teacher_id": teacher_id, "points": 0,
+    } for _, row in batch])
+    inserted = {card for (card,) in db.execute(stmt.on_conflict_do_nothing(index_elements=[students.c.student_id_card]).returning(students.c.student_id_card))}
+    db.commit()
+    for line, row in batch:
+        if row["student_id_card"] not in inserted: report.reject(line, row["student_id_card"], "A student with this ID card is already registered.")
+    report.accepted += len(inserted); report.batches += 1
+
+
+async def import_roster(db: Session, teacher_id: uuid.UUID, chunks: AsyncIterator[bytes], fmt: str) -> dict:
+    report = ImportReport()
+    parser = RowParser(fmt)
+    seen_in_upload = set()
+    batch: List[Tuple[int, dict]] = []
+    async for line_no, raw in iter_lines(chunks):
+        if not raw.strip(): continue
+        try:
+            record = parser.parse(decode_line(line_no, raw))
+        except (ValueError, csv.Error) as e:
+            if parser.header is None and fmt == "csv": raise
+            report.reject(line_no, None, f"Unparseable row: {e}")
+            continue
+        if record is None: continue  # CSV header
+        row = {f: str(record.get(f) or "").strip() for f in REQUIRED_FIELDS}
+        missing = [f for f in REQUIRED_FIELDS if not row[f]]
+        if missing:
+            report.reject(line_no, row["student_id_card"] or None, f"Missing fields: {', '.join(missing)}")
+            continue
+        if row["student_id_card"] in seen_in_upload:
+            report.reject(line_no, row["student_id_card"], "Duplicate student ID card in this upload.")
+            continue
+        seen_in_upload.add(row["student_id_card"])
+        batch.append((line_no, row))
+        if len(batch) >= BATCH_SIZE:
+            await run_in_threadpool(_insert_batch, db, teacher_id, batch, report)
+            batch = []
+    if batch: await run_in_threadpool(_insert_batch, db, teacher_id, batch, report)
+    return report.as_dict()
@@ -0,0 +1,43 @@
+import json
+import uuid
+from datetime import date, datetime
+
+from fastapi.responses import Response
+
+# Fast response path for hot payloads.
+# Payloads are built as plain dicts straight from column projections (no ORM instances, so no lazy loads and
+# no response_model validation) and encoded once, with orjson when it is installed and the stdlib otherwise.
+# Routes return the encoded bytes through json_response(); their response_model still documents the shape.
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same JSON, just slower
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)): return value.isoformat()
+    if isinstance(value, uuid.UUID): return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None: return orjson.dumps(payload)
+    return json.dumps(payload, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def json_response(body: bytes, headers: dict = None) -> Response:
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# --- Payload builders (shapes mirror the response models in main.py) ---
+def badge_payload(row) -> dict:
+    return {"name": row.name, "description": row.description, "icon_url": row.icon_url}
+
+
+def profile_payloads(students, badges) -> list:
+    """ StudentProfileResponse dicts from (id, full_name, points) rows and (student_id, name, description, icon_url)
+    rows, in the order of `students`. """
+    by_student = {}
+    for row in badges: by_student.setdefault(row.student_id, []).append(badge_payload(row))
+    return [{"id": row.id, "full_name": row.full_name, "points": row.points or 0, "badges": by_student.get(row.id, [])} for row in students]
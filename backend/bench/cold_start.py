@@ -0,0 +1,69 @@
+"""Cold-start benchmark: time from process spawn to the first successful response.
+
+Run from backend/:
+    DATABASE_URL=sqlite:///./bench.db python bench/cold_start.py --runs 5
+
+Each run starts a fresh uvicorn process, polls GET / until it answers, then reads
+/api/debug/startup for the app's own import time.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str, timeout: float = 1.0):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return response.status, response.read()
+
+
+def measure_once(timeout: float) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ, ECOQUEST_DEBUG_ENDPOINTS="1"),
+    )
+    try:
+        while True:
+            if proc.poll() is not None: raise RuntimeError(f"server exited with code {proc.returncode}")
+            if time.perf_counter() - started > timeout: raise TimeoutError("server did not answer in time")
+            try:
+                status, _ = _get(base + "/")
+                if status == 200: break
+            except OSError:
+                time.sleep(0.01)
+        first_response = time.perf_counter() - started
+        _, body = _get(base + "/api/debug/startup")
+        return {"time_to_first_response": first_response, "import_seconds": json.loads(body)["import_seconds"]}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    results = [measure_once(args.timeout) for _ in range(args.runs)]
+    for key in ("time_to_first_response", "import_seconds"):
+        values = [r[key] for r in results]
+        print(f"{key:>24}: median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms   max {max(values) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
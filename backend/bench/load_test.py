@@ -0,0 +1,262 @@
+"""Load test driving realistic mixes of the real API routes.
+
+Run from backend/ after building a synthetic school (see bench/synthetic_school.py):
+    DATABASE_URL=sqlite:///./bench.db python -m bench.load_test --spawn --duration 30 --workers 32
+    DATABASE_URL=... python -m bench.load_test --base-url http://127.0.0.1:8000 --mix login=1,quiz=3,dashboard=4
+
+Scenarios: login (login storm), quiz (quiz submission burst), dashboard (teacher dashboard polling),
+leaderboard (leaderboard reads) and review (teacher review sessions). Per route it reports p50/p95/p99
+latency, throughput, errors and DB statements per request (from X-DB-Queries; --spawn turns profiling on).
+
+    --save-baseline NAME   write the results to bench/baselines/NAME.json
+    --compare NAME         compare with that baseline; exits 1 if any route's p95 regressed more than --max-regression
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import Session
+
+from app import models
+from app.database import engine
+
+from .cold_start import _free_port, _get
+from .synthetic_school import BENCH_PASSWORD
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+DEFAULT_MIX = "login=1,quiz=3,dashboard=4,leaderboard=4,review=1"
+
+
+# --- Fixture sampling ---
+class Fixtures:
+    """ IDs, quiz answer keys and tokens sampled from the benchmark database before the run starts. """
+
+    def __init__(self, sample: int):
+        with Session(engine) as db:
+            self.teachers = [(t.id, t.email) for t in db.query(models.User.id, models.User.email).filter(models.User.email.like("%@bench.school")).limit(sample)]
+            self.students = [(s.id, s.student_id_card, s.class_name) for s in db.query(models.Student.id, models.Student.student_id_card, models.Student.class_name).filter(models.Student.student_id_card.like("BENCH-%")).limit(sample * 20)]
+            quizzes = db.query(models.EcoTask.id).filter(models.EcoTask.task_type == "quiz").all()
+            self.answer_keys = {}
+            for (task_id,) in quizzes:
+                self.answer_keys[task_id] = {str(q.id): q.correct_answer for q in db.query(models.QuizQuestion.id, models.QuizQuestion.correct_answer).filter(models.QuizQuestion.task_id == task_id)}
+        if not self.teachers or not self.students: raise SystemExit("No synthetic school found; run `python -m bench.synthetic_school` first.")
+        self.teacher_tokens = {}
+        self.student_tokens = {}
+        self.lock = threading.Lock()
+
+
+# --- HTTP ---
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statements = defaultdict(list)
+
+    def call(self, base: str, route: str, method: str, path: str, body=None, token=None):
+        headers = {"Content-Type": "application/json"}
+        if token: headers["Authorization"] = f"Bearer {token}"
+        data = json.dumps(body, default=str).encode() if body is not None else None
+        request = urllib.request.Request(base + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                payload = response.read(); status = response.status; queries = response.headers.get("X-DB-Queries")
+        except urllib.error.HTTPError as e:
+            payload = e.read(); status = e.code; queries = e.headers.get("X-DB-Queries")
+        except OSError:
+            payload, status, queries = b"", 0, None
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[route].append(elapsed)
+            if status >= 400 or status == 0: self.errors[route] += 1
+            if queries is not None: self.statements[route].append(int(queries))
+        try:
+            return json.loads(payload) if status < 400 and payload else None
+        except ValueError:
+            return None
+
+
+# --- Scenarios ---
+def _teacher(fx: Fixtures, rec: Recorder, base: str, rng: random.Random):
+    teacher_id, email = rng.choice(fx.teachers)
+    token = fx.teacher_tokens.get(teacher_id)
+    if token is None:
+        result = rec.call(base, "POST /api/teacher/login", "POST", "/api/teacher/login", {"email": email, "password": BENCH_PASSWORD})
+        token = (result or {}).get("access_token")
+        with fx.lock: fx.teacher_tokens[teacher_id] = token
+    return teacher_id, token
+
+
+def _student(fx: Fixtures, rec: Recorder, base: str, rng: random.Random):
+    student_id, card, class_name = rng.choice(fx.students)
+    token = fx.student_tokens.get(student_id)
+    if token is None:
+        result = rec.call(base, "POST /api/student/login", "POST", "/api/student/login", {"student_id_card": card})
+        token = (result or {}).get("access_token")
+        with fx.lock: fx.student_tokens[student_id] = token
+    return student_id, class_name, token
+
+
+def scenario_login(fx, rec, base, rng):
+    _, email = rng.choice(fx.teachers)
+    rec.call(base, "POST /api/teacher/login", "POST", "/api/teacher/login", {"email": email, "password": BENCH_PASSWORD})
+    for _ in range(5):
+        _, card, _ = rng.choice(fx.students)
+        rec.call(base, "POST /api/student/login", "POST", "/api/student/login", {"student_id_card": card})
+
+
+def scenario_quiz(fx, rec, base, rng):
+    student_id, _, token = _student(fx, rec, base, rng)
+    rec.call(base, "GET /api/tasks", "GET", "/api/tasks", token=token)
+    task_id, key = rng.choice(list(fx.answer_keys.items()))
+    answers = {qid: (correct if rng.random() < 0.8 else "A") for qid, correct in key.items()}
+    rec.call(base, "POST /api/student/{id}/submit/quiz/{id}", "POST", f"/api/student/{student_id}/submit/quiz/{task_id}", {"answers": answers}, token)
+    rec.call(base, "GET /api/student/{id}/profile", "GET", f"/api/student/{student_id}/profile", token=token)
+
+
+def scenario_dashboard(fx, rec, base, rng):
+    teacher_id, token = _teacher(fx, rec, base, rng)
+    rec.call(base, "GET /api/teacher/{id}/dashboard", "GET", f"/api/teacher/{teacher_id}/dashboard", token=token)
+    rec.call(base, "GET /api/teacher/{id}/roster", "GET", f"/api/teacher/{teacher_id}/roster?limit=100", token=token)
+    rec.call(base, "GET /api/teacher/{id}/submissions", "GET", f"/api/teacher/{teacher_id}/submissions?limit=100", token=token)
+
+
+def scenario_leaderboard(fx, rec, base, rng):
+    student_id, class_name, token = _student(fx, rec, base, rng)
+    rec.call(base, "GET /api/leaderboard", "GET", "/api/leaderboard")
+    rec.call(base, "GET /api/leaderboard/class/{name}", "GET", f"/api/leaderboard/class/{urllib.request.quote(class_name)}")
+    rec.call(base, "GET /api/student/{id}/rank", "GET", f"/api/student/{student_id}/rank")
+    rec.call(base, "GET /api/leaderboard/week", "GET", "/api/leaderboard/week")
+
+
+def scenario_review(fx, rec, base, rng):
+    teacher_id, token = _teacher(fx, rec, base, rng)
+    pending = rec.call(base, "GET /api/teacher/{id}/submissions", "GET", f"/api/teacher/{teacher_id}/submissions?limit=50", token=token) or []
+    ids = [s["id"] for s in pending]
+    if not ids: return
+    split = rng.randrange(len(ids) + 1)
+    rec.call(base, "POST /api/teacher/{id}/submissions/review", "POST", f"/api/teacher/{teacher_id}/submissions/review",
+             {"approve": ids[:split], "reject": ids[split:]}, token)
+
+
+SCENARIOS = {"login": scenario_login, "quiz": scenario_quiz, "dashboard": scenario_dashboard, "leaderboard": scenario_leaderboard, "review": scenario_review}
+
+
+# --- Running and reporting ---
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(base: str, mix: dict, duration: float, workers: int, seed: int, sample: int) -> dict:
+    rng = random.Random(seed)
+    fx = Fixtures(sample)
+    rec = Recorder()
+    names, weights = zip(*mix.items())
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_seed):
+        local = random.Random(worker_seed)
+        while time.perf_counter() < deadline:
+            SCENARIOS[local.choices(names, weights)[0]](fx, rec, base, local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(worker, [rng.random() for _ in range(workers)]))
+    elapsed = time.perf_counter() - started
+
+    routes = {}
+    for route, values in sorted(rec.latencies.items()):
+        stmts = rec.statements.get(route)
+        routes[route] = {
+            "requests": len(values), "errors": rec.errors.get(route, 0), "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(_percentile(values, 50) * 1000, 2), "p95_ms": round(_percentile(values, 95) * 1000, 2),
+            "p99_ms": round(_percentile(values, 99) * 1000, 2),
+            "db_statements": round(statistics.mean(stmts), 2) if stmts else None,
+        }
+    total = sum(r["requests"] for r in routes.values())
+    return {"duration_s": round(elapsed, 2), "workers": workers, "mix": mix, "total_requests": total, "total_rps": round(total / elapsed, 2), "routes": routes}
+
+
+def print_report(result: dict, baseline: dict = None):
+    print(f"{result['total_requests']} requests in {result['duration_s']}s ({result['total_rps']} req/s) with {result['workers']} workers")
+    print(f"{'route':<46}{'reqs':>7}{'err':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'stmts':>7}" + ("   p95 vs baseline" if baseline else ""))
+    for route, r in result["routes"].items():
+        line = f"{route:<46}{r['requests']:>7}{r['errors']:>6}{r['rps']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['db_statements'] if r['db_statements'] is not None else '-':>7}"
+        old = (baseline or {}).get("routes", {}).get(route)
+        if old and old["p95_ms"]: line += f"   {(r['p95_ms'] - old['p95_ms']) / old['p95_ms']:+.1%}"
+        print(line)
+
+
+def regressions(result: dict, baseline: dict, max_regression: float) -> list:
+    out = []
+    for route, r in result["routes"].items():
+        old = baseline.get("routes", {}).get(route)
+        if old and old["p95_ms"] and (r["p95_ms"] - old["p95_ms"]) / old["p95_ms"] > max_regression: out.append(route)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=None)
+    parser.add_argument("--spawn", action="store_true", help="start a local uvicorn server with SQL profiling enabled")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--sample", type=int, default=20, help="teachers to sample (students: 20x this)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline")
+    parser.add_argument("--compare")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    mix = {name: float(weight) for name, weight in (part.split("=") for part in args.mix.split(","))}
+    unknown = set(mix) - set(SCENARIOS)
+    if unknown: parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    server = None
+    base = args.base_url
+    if args.spawn:
+        port = _free_port(); base = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                                  env=dict(os.environ, ECOQUEST_SQL_PROFILE="1"))
+        for _ in range(300):
+            try:
+                if _get(base + "/")[0] == 200: break
+            except OSError:
+                time.sleep(0.1)
+    if not base: parser.error("pass --base-url or --spawn")
+
+    try:
+        result = run(base, mix, args.duration, args.workers, args.seed, args.sample)
+    finally:
+        if server: server.terminate(); server.wait()
+
+    baseline = None
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, args.compare + ".json")) as f: baseline = json.load(f)
+    print_report(result, baseline)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(os.path.join(BASELINE_DIR, args.save_baseline + ".json"), "w") as f: json.dump(result, f, indent=2)
+        print(f"Baseline saved as {args.save_baseline}")
+    if baseline:
+        regressed = regressions(result, baseline, args.max_regression)
+        if regressed:
+            print(f"p95 regressed by more than {args.max_regression:.0%} on: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Serialization microbenchmark for the student profile and leaderboard payloads.
+
+Run from backend/ (no database is touched; DATABASE_URL only has to be set for app imports):
+    DATABASE_URL=sqlite:///./bench.db python -m bench.serialization --badges 4 --limit 10
+
+Per payload it times three paths:
+  orm        the old path: ORM instances validated into the response_model, then jsonable_encoder + json.dumps
+             (what FastAPI does for a returned object). The lazy loads that path also triggered are not counted
+             here; they show up as extra statements in the X-DB-* headers.
+  projection flat column rows -> app.serialization.profile_payloads -> app.serialization.dumps
+  cached     a hit in app.response_cache
+"""
+import argparse
+import json
+import timeit
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+
+from app import models, serialization
+from app.main import StudentProfileResponse
+from app.response_cache import ResponseCache
+
+
+def _fixtures(students: int, badges: int):
+    badge_rows = [models.Badge(id=uuid.uuid4(), name=f"Badge {i}", description=f"Bench badge number {i}", icon_url="🏅") for i in range(badges)]
+    orm_students, student_rows, assoc_rows = [], [], []
+    for i in range(students):
+        student = models.Student(id=uuid.uuid4(), student_id_card=f"BENCH-{i:06d}", full_name=f"Student {i:06d}", class_name="Class 1", points=1000 - i)
+        student.badges = list(badge_rows)
+        orm_students.append(student)
+        student_rows.append(_Row(id=student.id, full_name=student.full_name, points=student.points))
+        assoc_rows.extend(_Row(student_id=student.id, name=b.name, description=b.description, icon_url=b.icon_url) for b in badge_rows)
+    return orm_students, student_rows, assoc_rows
+
+
+class _Row:
+    # Stands in for a SQLAlchemy Row: attribute access to the projected columns.
+    def __init__(self, **columns): self.__dict__.update(columns)
+
+
+def _orm_path(students):
+    # FastAPI's serialize_response followed by JSONResponse.render.
+    payload = [StudentProfileResponse.model_validate(s) for s in students]
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _projection_path(students, badges):
+    return serialization.dumps(serialization.profile_payloads(students, badges))
+
+
+def measure(name: str, count: int, badges: int, iterations: int) -> dict:
+    orm_students, student_rows, assoc_rows = _fixtures(count, badges)
+    cache = ResponseCache(ttl=60)
+    cache.put_board(count, _projection_path(student_rows, assoc_rows), cache.version, {r.id: r.points for r in student_rows})
+    timings = {
+        "orm": timeit.timeit(lambda: _orm_path(orm_students), number=iterations),
+        "projection": timeit.timeit(lambda: _projection_path(student_rows, assoc_rows), number=iterations),
+        "cached": timeit.timeit(lambda: cache.board(count), number=iterations),
+    }
+    return {"payload": name, **{path: seconds / iterations * 1e6 for path, seconds in timings.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--badges", type=int, default=4, help="badges per student")
+    parser.add_argument("--limit", type=int, default=10, help="leaderboard size")
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    print(f"JSON backend: {'orjson' if serialization.orjson is not None else 'json (stdlib)'}")
+    print(f"{'payload':<14}{'orm us':>10}{'projection us':>15}{'cached us':>11}{'speedup':>9}")
+    for name, count in (("profile", 1), (f"leaderboard/{args.limit}", args.limit)):
+        r = measure(name, count, args.badges, args.iterations)
+        print(f"{r['payload']:<14}{r['orm']:>10.1f}{r['projection']:>15.1f}{r['cached']:>11.2f}{r['orm'] / r['projection']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
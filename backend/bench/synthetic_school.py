@@ -0,0 +1,129 @@
+"""Builds a synthetic school in the database pointed at by DATABASE_URL, for load tests and benchmarks.
+
+Run from backend/ against a throwaway database (never production):
+    DATABASE_URL=sqlite:///./bench.db python -m bench.synthetic_school --students 5000 --submissions 200000
+
+Generation is deterministic for a given --seed, so runs against the same parameters are comparable.
+Every teacher's password is BENCH_PASSWORD and student ID cards are BENCH-000000, BENCH-000001, ...
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from app import crud, models
+from app.ledger import PERIODS, bucket_start
+from app.database import engine
+
+BENCH_PASSWORD = "bench-password"
+BATCH = 5000
+
+
+def _uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def _insert(db: Session, model, rows):
+    for i in range(0, len(rows), BATCH):
+        db.execute(models.Base.metadata.tables[model.__tablename__].insert(), rows[i:i + BATCH])
+
+
+def build_school(teachers: int, students: int, classes: int, photo_tasks: int, quizzes: int, questions: int,
+                 submissions: int, days: int, seed: int, reset: bool = False) -> dict:
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    if reset: models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    from passlib.context import CryptContext
+    password_hash = CryptContext(schemes=["bcrypt"], deprecated="auto").hash(BENCH_PASSWORD)
+
+    with Session(engine) as db:
+        crud.add_initial_data(db)
+        teacher_rows = [{"id": _uuid(rng), "email": f"teacher{i}@bench.school", "password": password_hash, "full_name": f"Teacher {i}"} for i in range(teachers)]
+        _insert(db, models.User, teacher_rows)
+
+        student_rows = [{
+            "id": _uuid(rng), "student_id_card": f"BENCH-{i:06d}", "full_name": f"Student {i:06d}",
+            "class_name": f"Class {i % classes}", "teacher_id": teacher_rows[i % teachers]["id"], "points": 0,
+        } for i in range(students)]
+        _insert(db, models.Student, student_rows)
+
+        task_rows, question_rows = [], []
+        for i in range(photo_tasks):
+            task_rows.append({"id": _uuid(rng), "title": f"Bench photo task {i}", "description": "Synthetic photo task", "points_reward": rng.choice([25, 50, 100]), "task_type": "photo_upload"})
+        for i in range(quizzes):
+            task_id = _uuid(rng)
+            task_rows.append({"id": task_id, "title": f"Bench quiz {i}", "description": "Synthetic quiz", "points_reward": rng.choice([10, 25, 50]), "task_type": "quiz"})
+            for q in range(questions):
+                question_rows.append({"id": _uuid(rng), "task_id": task_id, "question_text": f"Question {q} of quiz {i}?",
+                                      "option_a": "Option A", "option_b": "Option B", "option_c": "Option C", "correct_answer": rng.choice("ABC")})
+        _insert(db, models.EcoTask, task_rows)
+        _insert(db, models.QuizQuestion, question_rows)
+
+        now = datetime.utcnow()
+        points, rollups, ledger_rows = {}, {}, 0
+        for start in range(0, submissions, BATCH):
+            batch, ledger = [], []
+            for _ in range(min(BATCH, submissions - start)):
+                student, task = rng.choice(student_rows), rng.choice(task_rows)
+                if task["task_type"] == "quiz": status = rng.choices(["approved", "rejected"], [6, 4])[0]
+                else: status = rng.choices(["pending", "approved", "rejected"], [2, 6, 2])[0]
+                submitted_at = now - timedelta(seconds=rng.randrange(days * 86400))
+                batch.append({
+                    "id": _uuid(rng), "student_id": student["id"], "task_id": task["id"], "status": status,
+                    "submission_data": "Photo awaiting review" if task["task_type"] == "photo_upload" else f"Score: {questions}/{questions}",
+                    "submitted_at": submitted_at,
+                })
+                if status != "approved": continue
+                # Credit the points the way crud.credit_points does: a ledger row plus the day/week rollups.
+                reward = task["points_reward"]
+                points[student["id"]] = points.get(student["id"], 0) + reward
+                ledger.append({"id": _uuid(rng), "student_id": student["id"], "delta": reward,
+                               "reason": "quiz" if task["task_type"] == "quiz" else "photo_approval", "created_at": submitted_at})
+                for kind in PERIODS:
+                    key = (student["id"], kind, bucket_start(kind, submitted_at.date()))
+                    rollups[key] = rollups.get(key, 0) + reward
+            db.execute(models.StudentSubmission.__table__.insert(), batch)
+            if ledger: db.execute(models.PointsLedger.__table__.insert(), ledger)
+            ledger_rows += len(ledger)
+        if points:
+            db.execute(update(models.Student.__table__).where(models.Student.__table__.c.id == bindparam("sid")).values(points=bindparam("pts")),
+                       [{"sid": sid, "pts": pts} for sid, pts in points.items()])
+        students_by_id = {s["id"]: s for s in student_rows}
+        _insert(db, models.PointsRollup, [{
+            "student_id": sid, "bucket_kind": kind, "bucket_start": start, "class_name": students_by_id[sid]["class_name"],
+            "teacher_id": students_by_id[sid]["teacher_id"], "points": pts,
+        } for (sid, kind, start), pts in rollups.items()])
+        db.commit()
+        crud.rebuild_student_stats(db)
+
+    return {
+        "teachers": teachers, "students": students, "tasks": len(task_rows), "questions": len(question_rows),
+        "submissions": submissions, "ledger_rows": ledger_rows, "rollups": len(rollups), "seconds": round(time.perf_counter() - started, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teachers", type=int, default=40)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--classes", type=int, default=30)
+    parser.add_argument("--photo-tasks", type=int, default=10)
+    parser.add_argument("--quizzes", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=15)
+    parser.add_argument("--submissions", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=90, help="spread submissions over this many past days")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="drop all tables first")
+    args = parser.parse_args()
+    print(build_school(args.teachers, args.students, args.classes, args.photo_tasks, args.quizzes, args.questions,
+                       args.submissions, args.days, args.seed, reset=args.reset))
+
+
+if __name__ == "__main__":
+    main()
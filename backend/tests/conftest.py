@@ -0,0 +1,59 @@
+import os
+import tempfile
+import uuid
+
+# The app reads its configuration at import time, so point it at a throwaway SQLite database first.
+_tmp = tempfile.mkdtemp(prefix="ecoquest-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["ECOQUEST_PHOTO_ROOT"] = os.path.join(_tmp, "media")
+os.environ["ECOQUEST_SECRET_KEY"] = "test-secret-key"
+os.environ["ECOQUEST_HASH_WORKERS"] = "0"
+os.environ["ECOQUEST_SQL_PROFILE"] = "1"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import crud, models
+from app.badges import badge_engine
+from app.catalog import task_catalog
+from app.database import SessionLocal, engine
+from app.grading import answer_keys
+from app.instrumentation import sql_profiler
+from app.leaderboard import leaderboard
+from app.main import app
+from app.response_cache import response_cache
+
+
+@pytest.fixture
+def db():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    for reset in (leaderboard.reset, response_cache.clear, badge_engine.registry.invalidate, answer_keys.invalidate, task_catalog.invalidate, sql_profiler.reset):
+        reset()
+    with SessionLocal() as session:
+        crud.add_initial_data(session)
+        badge_engine.registry.sync(session)
+        yield session
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(app)
+
+
+@pytest.fixture
+def teacher(db):
+    return crud.create_teacher(db, email=f"{uuid.uuid4().hex}@school.test", password_hash="unused", full_name="Teacher")
+
+
+@pytest.fixture
+def student(db, teacher):
+    return crud.create_student(db, student_id_card=uuid.uuid4().hex, full_name="Student", class_name="Class 1", teacher_id=teacher.id)
+
+
+def task_of_type(db, task_type: str):
+    return db.query(models.EcoTask).filter(models.EcoTask.task_type == task_type).first()
+
+
+def pending_photo_submission(db, student):
+    return crud.create_submission(db, student.id, task_of_type(db, "photo_upload").id, "/api/photos/" + "0" * 64, "pending")
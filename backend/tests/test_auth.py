@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from jose import jwt
+
+from app.auth import ALGORITHM, create_access_token
+
+
+def test_unverifiable_token_is_anonymous_while_auth_is_optional(client, student):
+    foreign = jwt.encode({"sub": str(student.id), "role": "student"}, "another-instance-key", algorithm=ALGORITHM)
+    r = client.get(f"/api/student/{student.id}/profile", headers={"Authorization": f"Bearer {foreign}"})
+    assert r.status_code == 200
+
+
+def test_valid_token_is_still_enforced(client, student, teacher):
+    other = create_access_token(teacher.id, "student")
+    r = client.get(f"/api/student/{student.id}/profile", headers={"Authorization": f"Bearer {other}"})
+    assert r.status_code == 403
+
+
+def test_required_auth_refuses_to_start_without_a_key():
+    env = {k: v for k, v in os.environ.items() if k != "ECOQUEST_SECRET_KEY"}
+    env["ECOQUEST_REQUIRE_AUTH"] = "1"
+    result = subprocess.run([sys.executable, "-c", "import app.auth"], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert result.returncode != 0 and "ECOQUEST_SECRET_KEY" in result.stderr
+
+
+def test_debug_endpoints_are_opt_in(client):
+    for path in ("/api/debug/password-pool", "/api/debug/startup", "/api/debug/live", "/api/debug/response-cache"):
+        assert client.get(path).status_code == 404
@@ -0,0 +1,66 @@
+import pytest
+
+from app import crud, models
+from app.leaderboard import LEADERBOARD_REFRESH_SECONDS, leaderboard
+from app.response_cache import response_cache
+
+
+@pytest.fixture
+def classmates(db, teacher):
+    return [crud.create_student(db, student_id_card=f"LB-{i}", full_name=f"Pupil {i}", class_name="Class 1", teacher_id=teacher.id) for i in range(3)]
+
+
+@pytest.mark.parametrize("path", ["/api/leaderboard/class/Class 1", "/api/leaderboard/teacher/{teacher}", "/api/leaderboard/day"])
+def test_board_limit_is_validated(client, teacher, classmates, path):
+    url = path.format(teacher=teacher.id)
+    assert client.get(url, params={"limit": -1}).status_code == 400
+    assert client.get(url, params={"limit": 0}).status_code == 400
+    assert client.get(url, params={"limit": 10_000}).status_code == 200
+
+
+def test_class_board_limit_caps_entries(client, classmates):
+    assert len(client.get("/api/leaderboard/class/Class 1", params={"limit": 2}).json()) == 2
+
+
+def test_global_board_limit_is_validated(client, classmates):
+    assert client.get("/api/leaderboard", params={"limit": 0}).status_code == 400
+    assert client.get("/api/leaderboard", params={"limit": -5}).status_code == 400
+    assert len(client.get("/api/leaderboard", params={"limit": 2}).json()) == 2
+
+
+def test_cached_board_follows_points_changes(client, db, classmates):
+    assert client.get("/api/leaderboard", params={"limit": 1}).json()[0]["points"] == 0
+    submission = crud.create_submission(db, classmates[2].id, db.query(models.EcoTask).filter(models.EcoTask.task_type == "photo_upload").first().id, "photo", "pending")
+    client.post(f"/api/teacher/submissions/{submission.id}/approve")
+    top = client.get("/api/leaderboard", params={"limit": 1}).json()[0]
+    assert (top["id"], top["points"] > 0, [b["name"] for b in top["badges"]]) == (str(classmates[2].id), True, ["Eco Warrior", "First Steps"])
+
+
+def test_board_picks_up_writes_from_other_processes(client, db, teacher, classmates, monkeypatch):
+    assert len(client.get("/api/leaderboard", params={"limit": 10}).json()) == 3
+    # Another instance adds a student and credits points; this process never sees those writes.
+    newcomer = crud.create_student(db, student_id_card="LB-other", full_name="Pupil from elsewhere", class_name="Class 1", teacher_id=teacher.id)
+    crud.credit_points(db, {classmates[0].id: 40}, reason="quiz"); db.commit()
+    assert client.get(f"/api/student/{newcomer.id}/rank").status_code == 404
+    monkeypatch.setattr(leaderboard, "refresh_seconds", 0); response_cache.clear()
+    board = client.get("/api/leaderboard", params={"limit": 10}).json()
+    assert [(e["id"], e["points"]) for e in board][:1] == [(str(classmates[0].id), 40)] and len(board) == 4
+    assert client.get(f"/api/student/{newcomer.id}/rank").json()["total"] == 4
+
+
+def test_rebuild_keeps_points_written_while_it_runs(db, classmates):
+    leaderboard.ensure_seeded(db)
+    leaderboard.refresh_seconds = 0
+    query = db.query
+
+    def query_then_write(*args):
+        # A credit from this process lands after the rebuild's snapshot was read.
+        rows = query(*args)
+        leaderboard.set_points(classmates[1].id, 70)
+        return rows
+    try:
+        db.query = query_then_write
+        leaderboard.ensure_seeded(db)
+    finally:
+        del db.query; leaderboard.refresh_seconds = LEADERBOARD_REFRESH_SECONDS
+    assert leaderboard.top(1)[0]["id"] == classmates[1].id and leaderboard.top(1)[0]["points"] == 70
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from app import crud, ledger, models
+
+
+def _ledger_sum(db, student_id):
+    return db.query(func.sum(models.PointsLedger.delta)).filter(models.PointsLedger.student_id == student_id).scalar()
+
+
+def test_compaction_keeps_each_students_sum(db, teacher):
+    now = datetime(2025, 6, 1, 12)
+    old = now - timedelta(days=ledger.LEDGER_RETENTION_DAYS + 5)
+    a, b = (crud.create_student(db, student_id_card=f"L-{n}", full_name=n, class_name="Class 1", teacher_id=teacher.id) for n in "ab")
+    db.add_all([models.PointsLedger(student_id=a.id, delta=d, reason="quiz", created_at=old + timedelta(hours=i)) for i, d in enumerate((10, 25, 5))])
+    db.add_all([models.PointsLedger(student_id=a.id, delta=7, reason="quiz", created_at=now - timedelta(days=1)),
+                models.PointsLedger(student_id=b.id, delta=50, reason="photo_approval", created_at=old)])
+    db.add_all([models.PointsRollup(student_id=a.id, bucket_kind=kind, bucket_start=start, points=10) for kind, start in (
+        ("day", (now - timedelta(days=ledger.DAY_ROLLUP_RETENTION_DAYS + 1)).date()), ("day", now.date()),
+        ("week", ledger.bucket_start("week", (now - timedelta(days=ledger.DAY_ROLLUP_RETENTION_DAYS + 1)).date())))])
+    db.commit()
+
+    result = ledger.compact_ledger(db, now=now)
+
+    assert result == {"ledger_rows_folded": 3, "students_compacted": 1, "day_rollups_dropped": 1}
+    assert (_ledger_sum(db, a.id), _ledger_sum(db, b.id)) == (47, 50)
+    assert sorted(r.reason for r in db.query(models.PointsLedger).filter(models.PointsLedger.student_id == a.id)) == ["compacted", "quiz"]
+    assert db.query(models.PointsRollup).filter(models.PointsRollup.student_id == a.id).count() == 2
+    # Running it again has nothing left to fold.
+    assert ledger.compact_ledger(db, now=now)["ledger_rows_folded"] == 0 and _ledger_sum(db, a.id) == 47
+
+
+def test_windowed_boards_read_the_credited_buckets(client, db, teacher):
+    other = crud.create_teacher(db, email="other@school.test", password_hash="unused", full_name="Other")
+    a, b, c = (crud.create_student(db, student_id_card=f"W-{i}", full_name=f"Pupil {i}", class_name=cls, teacher_id=t.id)
+               for i, (cls, t) in enumerate((("Class 1", teacher), ("Class 2", teacher), ("Class 1", other))))
+    crud.credit_points(db, {a.id: 10, b.id: 30, c.id: 20}, reason="quiz"); db.commit()
+    crud.credit_points(db, {a.id: 25}, reason="quiz"); db.commit()
+    # Points from an earlier day count towards nothing in today's board.
+    db.add(models.PointsRollup(student_id=c.id, bucket_kind="day", bucket_start=datetime.utcnow().date() - timedelta(days=1), class_name="Class 1", teacher_id=other.id, points=500))
+    db.commit()
+
+    board = lambda **params: [(e["full_name"], e["points"]) for e in client.get("/api/leaderboard/day", params=params).json()]
+    assert board() == [("Pupil 0", 35), ("Pupil 1", 30), ("Pupil 2", 20)]
+    assert board(class_name="Class 1") == [("Pupil 0", 35), ("Pupil 2", 20)]
+    assert board(teacher_id=str(teacher.id), limit=1) == [("Pupil 0", 35)]
+    week = client.get("/api/leaderboard/week").json()
+    assert [e["points"] for e in week] == [35, 30, 20]
+
+
+def test_progress_returns_points_per_bucket(client, db, student):
+    today = datetime.utcnow().date()
+    crud.credit_points(db, {student.id: 15}, reason="quiz"); db.commit()
+    db.add_all([models.PointsRollup(student_id=student.id, bucket_kind="day", bucket_start=today - timedelta(days=d), points=p) for d, p in ((1, 40), (40, 99))])
+    db.commit()
+
+    progress = lambda **params: [(p["bucket_start"], p["points"]) for p in client.get(f"/api/student/{student.id}/progress", params=params).json()]
+    assert progress(period="day", buckets=7) == [(str(today - timedelta(days=1)), 40), (str(today), 15)]
+    assert progress(period="day", buckets=1) == [(str(today), 15)]
+    assert progress(period="week", buckets=1) == [(str(ledger.bucket_start("week", today)), 15)]
+    assert client.get(f"/api/student/{student.id}/progress", params={"period": "month"}).status_code == 400
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from app import models
+from app.auth import ALGORITHM, create_access_token
+from app.live import LEADERBOARD_TOPIC, LiveHub, Subscription, hub, student_topic, teacher_topic
+from app.main import _live_topics
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_events_reach_only_their_topics_subscribers():
+    async def scenario():
+        live = LiveHub()
+        teacher_sub, other_sub = live.subscribe([teacher_topic("t1")]), live.subscribe([teacher_topic("t2")])
+        # Routes publish from threadpool threads.
+        thread = threading.Thread(target=live.publish, args=(teacher_topic("t1"), {"type": "submission", "n": 1}))
+        thread.start(); thread.join()
+        return await teacher_sub.next_batch(timeout=1), await other_sub.next_batch(timeout=0.05)
+    delivered, elsewhere = _run(scenario())
+    assert delivered == [{"type": "submission", "n": 1, "topic": "teacher:t1"}] and elsewhere == []
+
+
+def test_events_about_the_same_thing_coalesce_to_the_latest():
+    async def scenario():
+        live = LiveHub()
+        sub = live.subscribe([student_topic("s1")])
+        for points in (10, 20, 30): live.publish(student_topic("s1"), {"type": "points", "points": points}, key=("points",))
+        live.publish(student_topic("s1"), {"type": "submission"})
+        await asyncio.sleep(0)
+        return await sub.next_batch(timeout=1), live.metrics()
+    batch, metrics = _run(scenario())
+    assert [(e["type"], e.get("points")) for e in batch] == [("points", 30), ("submission", None)]
+    assert (metrics["published"], metrics["coalesced"]) == (4, 2)
+
+
+def test_a_full_mailbox_collapses_to_a_single_resync():
+    async def scenario():
+        live = LiveHub()
+        sub = Subscription(live, [LEADERBOARD_TOPIC], mailbox_size=3)
+        for i in range(5): sub.offer(("e", i), {"type": "submission", "n": i})
+        first = await sub.next_batch(timeout=1)
+        sub.offer(("e", 9), {"type": "submission", "n": 9})
+        return first, await sub.next_batch(timeout=1), sub.overflows
+    first, after, overflows = _run(scenario())
+    assert [e["type"] for e in first] == ["resync", "submission"] and overflows == 1
+    assert after == [{"type": "submission", "n": 9}]
+
+
+def test_closed_subscriptions_stop_receiving():
+    async def scenario():
+        live = LiveHub()
+        sub = live.subscribe([LEADERBOARD_TOPIC]); sub.close()
+        live.publish(LEADERBOARD_TOPIC, {"type": "leaderboard_changed"})
+        return live.metrics()
+    assert _run(scenario())["published"] == 0
+
+
+def test_live_topics_follow_the_optional_auth_rule(student, teacher):
+    foreign = jwt.encode({"sub": str(student.id), "role": "student"}, "another-instance-key", algorithm=ALGORITHM)
+    assert _live_topics(foreign, None, student.id, False) == [student_topic(student.id)]
+    assert _live_topics(None, teacher.id, None, True) == [teacher_topic(teacher.id), LEADERBOARD_TOPIC]
+    with pytest.raises(HTTPException) as denied:
+        _live_topics(create_access_token(student.id, "student"), teacher.id, None, False)
+    assert denied.value.status_code == 403
+
+
+def test_batch_grading_notifies_the_teacher_before_the_board_is_built(client, db, teacher, student):
+    quiz = db.query(models.EcoTask).filter(models.EcoTask.task_type == "quiz").first()
+    answers = {str(q.id): q.correct_answer for q in quiz.questions}
+
+    async def scenario():
+        sub = hub.subscribe([teacher_topic(teacher.id)])
+        try:
+            r = await asyncio.to_thread(client.post, f"/api/quiz/{quiz.id}/grade-batch", json={"sheets": [{"student_id": str(student.id), "answers": answers}]})
+            assert r.status_code == 200
+            return await sub.next_batch(timeout=1)
+        finally:
+            sub.close()
+    batch = _run(scenario())
+    assert [(e["type"], e["student_id"], e["status"]) for e in batch] == [("submission", str(student.id), "approved")]
@@ -0,0 +1,28 @@
+from sqlalchemy import inspect
+
+from app import models
+from app.database import engine
+from app.manage import init_db
+
+from .conftest import pending_photo_submission
+
+
+def test_init_db_adds_missing_indexes_to_existing_tables(db):
+    db.close()
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes: index.drop(bind=engine)
+    init_db()
+    indexes = {i["name"] for i in inspect(engine).get_indexes("students")} | {i["name"] for i in inspect(engine).get_indexes("student_submissions")}
+    assert {"ix_students_points", "ix_students_teacher_name", "ix_student_submissions_student_submitted", "ix_student_submissions_status_submitted"} <= indexes
+
+
+def test_init_db_backfills_counters_when_upgrading_a_database_with_submissions(client, db, teacher, student):
+    submissions = [pending_photo_submission(db, student).id for _ in range(2)]
+    teacher_id = teacher.id
+    db.close()
+    # A database from before student_stats existed.
+    models.StudentStats.__table__.drop(bind=engine)
+    init_db()
+    assert client.post(f"/api/teacher/submissions/{submissions[0]}/approve").status_code == 200
+    row = client.get(f"/api/teacher/{teacher_id}/dashboard").json()["students"][0]
+    assert (row["pending_count"], row["approved_count"]) == (1, 1)
@@ -0,0 +1,55 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app import models
+from app.pagination import encode_cursor
+
+from .conftest import task_of_type
+
+
+def _walk(client, url):
+    rows, cursor = [], None
+    for _ in range(20):
+        r = client.get(url, params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        rows += r.json()
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor: return rows
+    raise AssertionError("pagination did not finish")
+
+
+def _add_submissions(db, student, submitted_at=None, n=6):
+    task = task_of_type(db, "photo_upload")
+    for i in range(n):
+        db.add(models.StudentSubmission(id=uuid.uuid4(), student_id=student.id, task_id=task.id, submission_data=f"photo {i}", status="pending", submitted_at=submitted_at))
+    db.commit()
+
+
+def test_pages_cover_rows_with_tied_timestamps(client, db, teacher, student):
+    _add_submissions(db, student, submitted_at=datetime(2024, 5, 1, 9, 30))
+    assert len(_walk(client, f"/api/student/{student.id}/submissions")) == 6
+    assert sorted(s["submission_data"] for s in _walk(client, f"/api/teacher/{teacher.id}/submissions")) == [f"photo {i}" for i in range(6)]
+
+
+def test_pages_cover_rows_inserted_in_the_same_second(client, db, teacher, student):
+    _add_submissions(db, student)
+    assert len(_walk(client, f"/api/student/{student.id}/submissions")) == 6
+    assert len(_walk(client, f"/api/teacher/{teacher.id}/submissions")) == 6
+
+
+@pytest.mark.parametrize("values", [[{"x": 1}, 2], ["a", "b"], [{"dt": 5}, 1], [{"dt": "2024-05-01T09:30:00"}, {"uuid": 5}], [{"dt": "not a date"}, {"uuid": "nope"}], [1], {"dt": 1}])
+def test_malformed_cursors_are_bad_requests(client, teacher, student, values):
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+    assert client.get(f"/api/student/{student.id}/submissions", params={"cursor": cursor}).status_code == 400
+    assert client.get(f"/api/teacher/{teacher.id}/submissions", params={"cursor": cursor}).status_code == 400
+    assert client.get(f"/api/teacher/{teacher.id}/roster", params={"cursor": cursor}).status_code == 400
+
+
+def test_cursor_types_follow_the_sort_key(client, teacher):
+    assert client.get(f"/api/teacher/{teacher.id}/roster", params={"cursor": encode_cursor("Pupil", uuid.uuid4())}).status_code == 200
+    assert client.get(f"/api/teacher/{teacher.id}/submissions", params={"cursor": encode_cursor("Pupil", uuid.uuid4())}).status_code == 400
+    assert client.get(f"/api/teacher/{teacher.id}/submissions", params={"cursor": encode_cursor(datetime(2024, 5, 1), uuid.uuid4())}).status_code == 200
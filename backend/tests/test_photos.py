@@ -0,0 +1,95 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app import main, models, photos
+from app.auth import create_access_token
+
+from .conftest import task_of_type
+
+
+def _jpeg(colour="green") -> bytes:
+    exif = Image.Exif()
+    exif[0x8825] = {1: "N", 2: (12.0, 30.0, 0.0), 3: "E", 4: (77.0, 36.0, 0.0)}  # GPS IFD
+    buf = io.BytesIO()
+    Image.new("RGB", (800, 600), colour).save(buf, "JPEG", exif=exif)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def upload_url(db, student):
+    return f"/api/student/{student.id}/submit/photo/{task_of_type(db, 'photo_upload').id}"
+
+
+def _sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_raw_upload_is_stored_under_its_hash_and_deduplicated(client, db, upload_url):
+    image = _jpeg()
+    first = client.post(upload_url, content=image, headers={"Content-Type": "image/jpeg"})
+    second = client.post(upload_url, content=image, headers={"Content-Type": "image/jpeg"})
+    assert first.status_code == second.status_code == 200
+    assert first.json()["photo"] == second.json()["photo"] == f"/api/photos/{_sha(image)}"
+    with open(photos.original_path(_sha(image)), "rb") as f: assert f.read() == image
+    assert db.query(models.Photo).count() == 1
+    assert db.query(models.StudentSubmission).filter(models.StudentSubmission.submission_data == f"/api/photos/{_sha(image)}").count() == 2
+    assert os.listdir(os.path.join(photos.PHOTO_ROOT, "tmp")) == []
+
+
+def test_multipart_upload_streams_the_photo_part(client, db, upload_url):
+    image = _jpeg("blue")
+    r = client.post(upload_url, data={"note": "before the file"}, files={"photo": ("bins.jpg", image, "image/jpeg")})
+    assert r.status_code == 200 and r.json()["photo"] == f"/api/photos/{_sha(image)}"
+    with open(photos.original_path(_sha(image)), "rb") as f: assert f.read() == image
+    assert db.get(models.Photo, _sha(image)).content_type == "image/jpeg"
+
+
+def test_multipart_without_a_photo_or_with_a_broken_body_is_a_bad_request(client, upload_url):
+    assert client.post(upload_url, data={"note": "no file"}, files={"other": ("x.jpg", b"abc", "image/jpeg")}).status_code == 400
+    truncated = b"--XYZ\r\nContent-Disposition: form-data; name=\"photo\"; filename=\"a.jpg\"\r\nContent-Type: image/jpeg\r\n\r\nabc"
+    assert client.post(upload_url, content=truncated, headers={"Content-Type": "multipart/form-data; boundary=XYZ"}).status_code == 400
+
+
+def test_unsupported_types_are_rejected(client, upload_url):
+    assert client.post(upload_url, content=b"hello", headers={"Content-Type": "text/plain"}).status_code == 415
+    assert client.post(upload_url, files={"photo": ("notes.txt", b"hello", "text/plain")}).status_code == 415
+
+
+def test_oversized_uploads_are_rejected(client, upload_url, monkeypatch):
+    monkeypatch.setattr(photos, "MAX_PHOTO_BYTES", 1000); monkeypatch.setattr(main, "MAX_PHOTO_BYTES", 1000)
+    # Declared too large: refused before any of the body is stored.
+    assert client.post(upload_url, content=b"x" * 2000, headers={"Content-Type": "image/jpeg"}).status_code == 413
+    assert client.post(upload_url, files={"photo": ("big.jpg", b"x" * (1000 + photos.MULTIPART_OVERHEAD_BYTES), "image/jpeg")}).status_code == 413
+    # No Content-Length (chunked): cut off while streaming, and the partial file is removed.
+    assert client.post(upload_url, content=iter([b"x" * 600, b"x" * 600]), headers={"Content-Type": "image/jpeg"}).status_code == 413
+    assert os.listdir(os.path.join(photos.PHOTO_ROOT, "tmp")) == []
+
+
+def test_thumbnail_is_made_after_the_response(db, upload_url):
+    image = _jpeg("red")
+    with TestClient(main.app) as client:
+        assert client.post(upload_url, content=image, headers={"Content-Type": "image/jpeg"}).status_code == 200
+        for _ in range(100):
+            r = client.get(f"/api/photos/{_sha(image)}/thumbnail")
+            if r.status_code != 202: break
+            time.sleep(0.02)
+    assert r.status_code == 200 and r.headers["content-type"] == "image/jpeg"
+    assert dict(Image.open(io.BytesIO(r.content)).getexif()) == {}
+    db.expire_all()
+    photo = db.get(models.Photo, _sha(image))
+    assert (photo.status, photo.width, photo.latitude, photo.longitude) == ("ready", 800, 12.5, 77.6)
+
+
+def test_originals_are_for_teachers(client, db, upload_url, student, teacher):
+    image = _jpeg("purple")
+    client.post(upload_url, content=image, headers={"Content-Type": "image/jpeg"})
+    url = f"/api/photos/{_sha(image)}"
+    assert client.get(url, headers={"Authorization": f"Bearer {create_access_token(student.id, 'student')}"}).status_code == 403
+    r = client.get(url, headers={"Authorization": f"Bearer {create_access_token(teacher.id, 'teacher')}"})
+    assert r.status_code == 200 and r.content == image
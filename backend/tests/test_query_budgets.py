@@ -0,0 +1,50 @@
+import pytest
+
+from app import crud
+from app.instrumentation import QueryBudgetExceeded, sql_profiler
+from app.main import ROUTE_QUERY_BUDGETS
+
+from .conftest import pending_photo_submission
+
+
+def test_hot_routes_stay_within_their_query_budgets(client, db, teacher, student):
+    pending_photo_submission(db, student)
+    urls = {
+        "/api/tasks": "/api/tasks",
+        "/api/leaderboard": "/api/leaderboard",
+        "/api/student/{student_id}/profile": f"/api/student/{student.id}/profile",
+        "/api/teacher/{teacher_id}/submissions": f"/api/teacher/{teacher.id}/submissions",
+    }
+    assert set(urls) == set(ROUTE_QUERY_BUDGETS)
+    for route, url in urls.items():
+        r = client.get(url)
+        assert r.status_code == 200
+        assert int(r.headers["X-DB-Queries"]) <= ROUTE_QUERY_BUDGETS[route], route
+    sql_profiler.check_budgets()
+
+
+def test_budget_violations_are_reported(client, student):
+    sql_profiler.declare_budget("/api/student/{student_id}/profile", 0)
+    try:
+        r = client.get(f"/api/student/{student.id}/profile")
+        assert r.headers["X-DB-Budget-Exceeded"] == "1"
+        with pytest.raises(QueryBudgetExceeded):
+            sql_profiler.check_budgets()
+    finally:
+        sql_profiler.declare_budget("/api/student/{student_id}/profile", ROUTE_QUERY_BUDGETS["/api/student/{student_id}/profile"])
+
+
+def test_count_queries_enforces_a_budget(db):
+    with pytest.raises(QueryBudgetExceeded):
+        with sql_profiler.count_queries(1):
+            crud.get_all_tasks(db); crud.get_leaderboard(db)
+
+
+def test_rows_fetched_are_counted(client, db, teacher):
+    for i in range(3): crud.create_student(db, student_id_card=f"ROWS-{i}", full_name=f"Pupil {i}", class_name="Class 1", teacher_id=teacher.id)
+    r = client.get(f"/api/teacher/{teacher.id}/roster", params={"limit": 2})
+    assert (r.headers["X-DB-Queries"], r.headers["X-DB-Rows"]) == ("1", "3")  # one page plus the look-ahead row
+    assert sql_profiler.report()["/api/teacher/{teacher_id}/roster"]["rows"] == 3
+    with sql_profiler.count_queries() as stats:
+        crud.get_all_tasks(db)
+    assert stats.rows == 4
@@ -0,0 +1,24 @@
+from app import models
+
+from .conftest import task_of_type
+
+
+def _answers(db, quiz, correct=True):
+    return {str(q.id): q.correct_answer if correct else "Z" for q in quiz.questions}
+
+
+def test_quiz_is_graded(client, db, student):
+    quiz = task_of_type(db, "quiz")
+    r = client.post(f"/api/student/{student.id}/submit/quiz/{quiz.id}", json={"answers": _answers(db, quiz)})
+    assert r.json()["status"] == "approved"
+    db.expire_all()
+    assert db.get(models.Student, student.id).points == quiz.points_reward
+
+
+def test_non_quiz_tasks_are_not_graded(client, db, student):
+    photo_task = task_of_type(db, "photo_upload")
+    assert client.post(f"/api/student/{student.id}/submit/quiz/{photo_task.id}", json={"answers": {}}).status_code == 404
+    assert client.post(f"/api/quiz/{photo_task.id}/grade-batch", json={"sheets": [{"student_id": str(student.id), "answers": {}}]}).status_code == 404
+    db.expire_all()
+    assert db.get(models.Student, student.id).points == 0
+    assert db.query(models.StudentSubmission).count() == 0
@@ -0,0 +1,60 @@
+import json
+
+from app import crud, models
+from app.roster_import import ImportReport, _insert_batch
+
+
+def _import(client, teacher, body: bytes, content_type="text/csv"):
+    r = client.post(f"/api/teacher/{teacher.id}/students/import", content=body, headers={"Content-Type": content_type})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _cards(db, teacher):
+    return sorted(card for (card,) in db.query(models.Student.student_id_card).filter(models.Student.teacher_id == teacher.id))
+
+
+def test_csv_import(client, db, teacher):
+    body = "﻿student_id_card,full_name,class_name\r\nC-1,Asha,Class 1\r\nC-2,\"Ravi, Jr.\",Class 2\r\n".encode()
+    report = _import(client, teacher, body)
+    assert (report["accepted"], report["rejected"], report["batches"]) == (2, 0, 1)
+    assert _cards(db, teacher) == ["C-1", "C-2"]
+
+
+def test_ndjson_import(client, db, teacher):
+    body = b"".join(json.dumps({"student_id_card": f"N-{i}", "full_name": f"Pupil {i}", "class_name": "Class 1"}).encode() + b"\n" for i in range(3))
+    report = _import(client, teacher, body, "application/x-ndjson")
+    assert (report["accepted"], report["rejected"]) == (3, 0)
+    assert _cards(db, teacher) == ["N-0", "N-1", "N-2"]
+
+
+def test_duplicates_are_rejected_and_reported(client, db, teacher, student):
+    body = f"student_id_card,full_name,class_name\nD-1,Asha,Class 1\nD-1,Asha again,Class 1\n{student.student_id_card},Existing,Class 1\n".encode()
+    report = _import(client, teacher, body)
+    assert (report["accepted"], report["rejected"]) == (1, 2)
+    assert [(r["line"], r["student_id_card"]) for r in report["rejections"]] == [(3, "D-1"), (4, student.student_id_card)]
+
+
+def test_malformed_rows_are_rejected_without_stopping_the_import(client, db, teacher):
+    body = b"student_id_card,full_name,class_name\nM-1,Asha,Class 1\nM-2,,Class 1\nM-3,Ravi \xff\xfe,Class 1\nM-4,Meera,Class 2\n"
+    report = _import(client, teacher, body)
+    assert (report["accepted"], report["rejected"]) == (2, 2)
+    assert [r["line"] for r in report["rejections"]] == [3, 4]
+    assert _cards(db, teacher) == ["M-1", "M-4"]
+    ndjson = b'{"student_id_card": "J-1", "full_name": "Asha", "class_name": "Class 1"}\n[1, 2]\nnot json\n'
+    assert _import(client, teacher, ndjson, "application/x-ndjson")["rejected"] == 2
+
+
+def test_csv_without_required_columns_is_a_bad_request(client, teacher):
+    r = client.post(f"/api/teacher/{teacher.id}/students/import", content=b"card,name\nX,Y\n", headers={"Content-Type": "text/csv"})
+    assert r.status_code == 400
+
+
+def test_card_inserted_concurrently_is_reported_not_raised(db, teacher):
+    # Another request registered the card after this upload was parsed.
+    crud.create_student(db, student_id_card="RACE-1", full_name="Other", class_name="Class 1", teacher_id=teacher.id)
+    report = ImportReport()
+    _insert_batch(db, teacher.id, [(2, {"student_id_card": "RACE-1", "full_name": "Asha", "class_name": "Class 1"}),
+                                   (3, {"student_id_card": "RACE-2", "full_name": "Ravi", "class_name": "Class 1"})], report)
+    assert (report.accepted, report.rejected, report.rejections[0]["line"]) == (1, 1, 2)
+    assert db.query(models.Student).filter(models.Student.student_id_card == "RACE-2").count() == 1
@@ -0,0 +1,39 @@
+from app import crud, models
+from app.auth import create_access_token
+
+from .conftest import pending_photo_submission
+
+
+def test_approve_credits_points_once(client, db, student):
+    submission = pending_photo_submission(db, student)
+    reward = submission.task.points_reward
+    assert client.post(f"/api/teacher/submissions/{submission.id}/approve").status_code == 200
+    assert client.post(f"/api/teacher/submissions/{submission.id}/approve").status_code == 404
+    assert client.post(f"/api/teacher/submissions/{submission.id}/reject").status_code == 404
+
+    db.expire_all()
+    stats = db.get(models.StudentStats, student.id)
+    assert db.get(models.Student, student.id).points == reward
+    assert db.query(models.PointsLedger).filter(models.PointsLedger.student_id == student.id).count() == 1
+    assert (stats.pending_count, stats.approved_count) == (0, 1)
+
+
+def test_reject_leaves_points_alone(client, db, student):
+    submission = pending_photo_submission(db, student)
+    assert client.post(f"/api/teacher/submissions/{submission.id}/reject").status_code == 200
+    assert client.post(f"/api/teacher/submissions/{submission.id}/reject").status_code == 404
+
+    db.expire_all()
+    stats = db.get(models.StudentStats, student.id)
+    assert db.get(models.Student, student.id).points == 0
+    assert (stats.pending_count, stats.rejected_count) == (0, 1)
+
+
+def test_teachers_only_decide_their_own_students_submissions(client, db, student, teacher):
+    other = crud.create_teacher(db, email="other@school.test", password_hash="unused", full_name="Other Teacher")
+    submission = pending_photo_submission(db, student)
+    for token, expected in ((create_access_token(other.id, "teacher"), 404), (create_access_token(teacher.id, "teacher"), 200)):
+        r = client.post(f"/api/teacher/submissions/{submission.id}/approve", headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == expected
+    db.expire_all()
+    assert db.get(models.StudentSubmission, submission.id).status == "approved"
@@ -20,19 +20,28 @@ const session = {
 // --- API HELPERS ---
 const api = {
     async request(endpoint, options = {}) {
+        return (await api.fetchJson(endpoint, options)).data;
+    },
+    // Keyset-paginated list routes return the next page's cursor in X-Next-Cursor (absent on the last page).
+    async requestPage(endpoint, cursor) {
+        const { data, headers } = await api.fetchJson(cursor ? `${endpoint}?cursor=${encodeURIComponent(cursor)}` : endpoint);
+        return { items: data, nextCursor: headers.get('X-Next-Cursor') };
+    },
+    async fetchJson(endpoint, options = {}) {
         const url = `${API_BASE_URL}${endpoint}`;
-        const headers = { 'Content-Type': 'application/json', ...options.headers };
+        const token = session.getUser()?.access_token;
+        const headers = { 'Content-Type': 'application/json', ...(token && { 'Authorization': `Bearer ${token}` }), ...options.headers };
         const config = { ...options, headers };
         if (options.body) config.body = JSON.stringify(options.body);
+        if (options.rawBody) config.body = options.rawBody;
         try {
             const response = await fetch(url, config);
             if (!response.ok) {
                 const errorData = await response.json();
                 throw new Error(errorData.detail || 'An API error occurred');
             }
-            if (response.headers.get("content-type")?.includes("application/json")) {
-                return response.json();
-            }
+            const data = response.headers.get("content-type")?.includes("application/json") ? await response.json() : undefined;
+            return { data, headers: response.headers };
         } catch (error) {
             console.error('API Request Error:', error);
             throw error;
@@ -46,15 +55,30 @@ const api = {
     createFullQuiz: (quizData) => api.request('/api/quiz', { method: 'POST', body: quizData }),
     getStudentSubmissionHistory: (studentId) => api.request(`/api/student/${studentId}/submissions`),
     submitQuiz: (studentId, taskId, answers) => api.request(`/api/student/${studentId}/submit/quiz/${taskId}`, { method: 'POST', body: { answers } }),
-    submitPhoto: (studentId, taskId) => api.request(`/api/student/${studentId}/submit/photo/${taskId}`, { method: 'POST' }),
-    getTeacherSubmissions: (teacherId) => api.request(`/api/teacher/${teacherId}/submissions`),
-    getTeacherRoster: (teacherId) => api.request(`/api/teacher/${teacherId}/roster`),
+    submitPhoto: (studentId, taskId, photoBlob) => api.request(`/api/student/${studentId}/submit/photo/${taskId}`, photoBlob
+        ? { method: 'POST', rawBody: photoBlob, headers: { 'Content-Type': photoBlob.type || 'image/jpeg' } }
+        : { method: 'POST' }),
+    getTeacherSubmissions: (teacherId, cursor) => api.requestPage(`/api/teacher/${teacherId}/submissions`, cursor),
+    getTeacherDashboard: (teacherId) => api.request(`/api/teacher/${teacherId}/dashboard`),
     addStudent: (teacherId, fullName, className, studentIdCard) => api.request(`/api/teacher/${teacherId}/add-student`, { method: 'POST', body: { full_name: fullName, class_name: className, student_id_card: studentIdCard } }),
     approveSubmission: (submissionId) => api.request(`/api/teacher/submissions/${submissionId}/approve`, { method: 'POST' }),
     rejectSubmission: (submissionId) => api.request(`/api/teacher/submissions/${submissionId}/reject`, { method: 'POST' }),
     getLeaderboard: () => api.request('/api/leaderboard'),
 };
 
+// --- LIVE UPDATES ---
+// Server-pushed events (see /api/live/events) so pages can refresh only when something actually changed.
+const live = {
+    subscribe(params, onEvent) {
+        const token = session.getUser()?.access_token;
+        const query = new URLSearchParams({ ...params, ...(token && { token }) });
+        const source = new EventSource(`${API_BASE_URL}/api/live/events?${query}`);
+        ['submission', 'points', 'leaderboard_changed', 'resync'].forEach(type =>
+            source.addEventListener(type, (event) => onEvent(JSON.parse(event.data))));
+        return source;
+    }
+};
+
 // --- PAGE INITIALIZER ROUTER ---
 document.addEventListener('DOMContentLoaded', () => {
     const pagePath = window.location.pathname;
@@ -120,7 +144,7 @@ async function initTeacherDashboardPage() {
     if (!user || user.type !== 'teacher') return window.location.href = 'teacher_login.html';
     const teacherName = document.getElementById('teacher-name');
     if (teacherName) teacherName.textContent = user.full_name;
-    // await refreshTeacherDashboard(user.teacher_id);
+    await refreshTeacherDashboard(user.teacher_id);
 }
 
 async function initStudentDashboardPage() {
@@ -312,6 +336,11 @@ async function initQuizPage() {
 async function initLeaderboardPage() {
     const container = document.getElementById('leaderboard-content');
     if (!container) return;
+    await renderLeaderboard(container);
+    live.subscribe({}, () => renderLeaderboard(container));
+}
+
+async function renderLeaderboard(container) {
     try {
         const leaderboard = await api.getLeaderboard();
         container.innerHTML = `<table class="list-table"><thead><tr><th>Rank</th><th>Name</th><th>Points</th></tr></thead><tbody>${leaderboard.map((s, i) => `
@@ -323,20 +352,35 @@ async function initLeaderboardPage() {
 }
 
 // --- DYNAMIC DATA & RENDER FUNCTIONS ---
+// Roster, counters and analytics come from the single dashboard call; the review queue is paged separately
+// because it needs submission ids for the Approve/Reject buttons.
 async function refreshTeacherDashboard(teacherId) {
     try {
-        const [submissions, roster] = await Promise.all([
-            api.getTeacherSubmissions(teacherId),
-            api.getTeacherRoster(teacherId)
+        const [dashboard, firstPage] = await Promise.all([
+            api.getTeacherDashboard(teacherId),
+            api.getTeacherSubmissions(teacherId)
         ]);
-        renderSubmissions(submissions);
-        renderRoster(roster);
-        renderAnalyticsChart(roster);
+        pendingQueue = { teacherId, items: firstPage.items, nextCursor: firstPage.nextCursor };
+        renderSubmissions(pendingQueue);
+        renderRoster(dashboard.students);
+        renderAnalyticsChart(dashboard.students);
     } catch (error) {
         alert(`Could not refresh dashboard data: ${error.message}`);
     }
 }
 
+let pendingQueue = { teacherId: null, items: [], nextCursor: null };
+
+async function loadMoreSubmissions() {
+    try {
+        const page = await api.getTeacherSubmissions(pendingQueue.teacherId, pendingQueue.nextCursor);
+        pendingQueue = { ...pendingQueue, items: pendingQueue.items.concat(page.items), nextCursor: page.nextCursor };
+        renderSubmissions(pendingQueue);
+    } catch (error) {
+        alert(`Could not load more submissions: ${error.message}`);
+    }
+}
+
 function renderStudentDashboard(container, profile, tasks) {
     if (!container) return;
     const getPet = (points) => {
@@ -351,14 +395,15 @@ function renderStudentDashboard(container, profile, tasks) {
 }
 
 // **FIXED**: This function now targets the inner content div to prevent duplication.
-function renderSubmissions(submissions) {
+function renderSubmissions({ items: submissions, nextCursor }) {
     const container = document.getElementById('submissions-content');
     if (!container) return;
     if (submissions.length === 0) {
         container.innerHTML = '<p>No pending submissions. Great job!</p>';
     } else {
         const tableRows = submissions.map(s => `<tr><td>${s.student_name}</td><td>${s.task_title}</td><td class="submission-actions"><button class="btn btn-green" onclick="approveSubmission('${s.id}')">Approve</button><button class="btn btn-red" onclick="rejectSubmission('${s.id}')">Reject</button></td></tr>`).join('');
-        container.innerHTML = `<table class="list-table"><thead><tr><th>Student</th><th>Task</th><th>Actions</th></tr></thead><tbody>${tableRows}</tbody></table>`;
+        const more = nextCursor ? '<button class="btn btn-blue" onclick="loadMoreSubmissions()">Load more</button>' : '';
+        container.innerHTML = `<table class="list-table"><thead><tr><th>Student</th><th>Task</th><th>Actions</th></tr></thead><tbody>${tableRows}</tbody></table>${more}`;
     }
 }
 
@@ -369,8 +414,8 @@ function renderRoster(roster) {
     if (roster.length === 0) {
         container.innerHTML = '<p>No students have been added yet.</p>';
     } else {
-        const tableRows = roster.map(s => `<tr><td>${s.full_name}</td><td>${s.class_name}</td><td>${s.points}</td></tr>`).join('');
-        container.innerHTML = `<table class="list-table"><thead><tr><th>Name</th><th>Class</th><th>Points</th></tr></thead><tbody>${tableRows}</tbody></table>`;
+        const tableRows = roster.map(s => `<tr><td>${s.full_name}</td><td>${s.class_name || ''}</td><td>${s.points}</td><td>${s.pending_count}</td><td>${s.approved_count}</td></tr>`).join('');
+        container.innerHTML = `<table class="list-table"><thead><tr><th>Name</th><th>Class</th><th>Points</th><th>Pending</th><th>Approved</th></tr></thead><tbody>${tableRows}</tbody></table>`;
     }
 }
 
@@ -378,7 +423,7 @@ function renderAnalyticsChart(roster) {
     const chartEl = document.getElementById('tasksChart');
     if (!chartEl) return;
     const ctx = chartEl.getContext('2d');
-    if (myChart) myChart.destroy();
+    (myChart || Chart.getChart(chartEl))?.destroy();
     const dist = { 'Beginner (0-100)': 0, 'Intermediate (101-300)': 0, 'Advanced (>300)': 0 };
     roster.forEach(s => {
         if (s.points <= 100) dist['Beginner (0-100)']++;
@@ -456,7 +501,8 @@ function setupCameraUI(container, task) {
 
     submitBtn.addEventListener('click', async () => {
         try {
-            await api.submitPhoto(user.student_id, task.id);
+            const photoBlob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.9));
+            await api.submitPhoto(user.student_id, task.id, photoBlob);
             alert('Photo submitted for review!');
             setTimeout(() => window.location.href = 'student_dashboard.html', 1500);
         } catch (error) {